@@ -8,25 +8,19 @@ from django.core.exceptions import ImproperlyConfigured
 import dj_database_url
 from dotenv import load_dotenv
 
-print("--- Loading settings.py ---")
-
 # Build paths
 BASE_DIR = Path(__file__).resolve().parent.parent
-print("BASE_DIR: OK")
 
 # Load .env file
 load_dotenv(BASE_DIR / '.env')
-print("dotenv: OK")
 
 # Secret Key
 SECRET_KEY = os.getenv('DJANGO_SECRET_KEY')
 if not SECRET_KEY:
     raise ImproperlyConfigured("CRITICAL ERROR: DJANGO_SECRET_KEY environment variable not set.")
-print("SECRET_KEY: OK")
 
 # Debug
 DEBUG = os.getenv('DEBUG', 'False') == 'True'
-print(f"DEBUG: {DEBUG}")
 
 # Allowed Hosts
 ALLOWED_HOSTS = []
@@ -34,7 +28,6 @@ if os.getenv('VERCEL_URL'):
     ALLOWED_HOSTS.append(os.getenv('VERCEL_URL').split('//')[1])
 else:
     ALLOWED_HOSTS.extend(['127.0.0.1', 'localhost'])
-print(f"ALLOWED_HOSTS: {ALLOWED_HOSTS}")
 
 # Application definition
 INSTALLED_APPS = [
@@ -46,8 +39,8 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
+    'channels',
 ]
-print("INSTALLED_APPS: OK")
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -58,11 +51,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'basic.middleware.NotificationBatchMiddleware',
 ]
-print("MIDDLEWARE: OK")
 
 ROOT_URLCONF = 'LazyOne.urls'
-print("ROOT_URLCONF: OK")
 
 TEMPLATES = [
     {
@@ -76,14 +68,15 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'basic.context_processors.unread_notifications_count',
+                'basic.context_processors.realtime',
             ],
         },
     },
 ]
-print("TEMPLATES: OK")
 
 WSGI_APPLICATION = 'LazyOne.wsgi.application'
-print("WSGI_APPLICATION: OK")
+
+ASGI_APPLICATION = 'LazyOne.asgi.application'
 
 # Database
 DATABASE_URL = os.getenv('DATABASE_URL')
@@ -93,8 +86,66 @@ if not DATABASE_URL:
 DATABASES = {
     'default': dj_database_url.config(conn_max_age=600)
 }
-print("DATABASES: OK")
 
+# Cache (Redis in production, per-process memory locally)
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Channel layer for realtime pushes (Redis in production, in-memory locally)
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
+
+# Whether pages open WebSockets (notifications, chat). Only the ASGI server (the Docker image
+# runs daphne) serves them; the Vercel WSGI deployment leaves this off and pages fall back to
+# plain HTTP.
+REALTIME_WEBSOCKETS = os.getenv('REALTIME_WEBSOCKETS', 'False') == 'True'
+
+# Notifications: 'inline' writes them at the end of the request, 'outbox' hands them to
+# the drain_notification_outbox worker.
+NOTIFICATION_DELIVERY = os.getenv('NOTIFICATION_DELIVERY', 'inline')
+
+# Read notifications older than this are removed by the prune_notifications command.
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', '90'))
+
+# Archived chats and notifications are private, so they live under their own root, which is
+# never served (unlike MEDIA_ROOT).
+ARCHIVE_ROOT = Path(os.getenv('ARCHIVE_ROOT', BASE_DIR / 'archive'))
+
+# Chats of completed/cancelled tasks idle for longer than this are moved to compressed archive
+# segments under ARCHIVE_ROOT by the archive_chats command.
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv('CHAT_ARCHIVE_AFTER_DAYS', '30'))
+
+# Firestore. Set FIRESTORE_EMULATOR_HOST (e.g. localhost:8080) to run the Firestore sync
+# paths against the local emulator instead of the real project.
+FIRESTORE_EMULATOR_HOST = os.getenv('FIRESTORE_EMULATOR_HOST', '')
+FIRESTORE_EMULATOR_PROJECT_ID = os.getenv('FIRESTORE_EMULATOR_PROJECT_ID', 'demo-lazyone')
+
+# Target for a cold start (importing the WSGI app plus warmup), checked by the
+# profile_cold_start command.
+COLD_START_BUDGET_MS = int(os.getenv('COLD_START_BUDGET_MS', '1000'))
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -103,31 +154,24 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator'},
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
 ]
-print("AUTH_PASSWORD_VALIDATORS: OK")
 
 # Auth Backend
 AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
-print("AUTHENTICATION_BACKENDS: OK")
 
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
-print("I18N: OK")
 
 # Static files
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-print("STATIC_FILES: OK")
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'mediafiles'
-print("MEDIA_FILES: OK")
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-print("DEFAULT_AUTO_FIELD: OK")
 
-print("--- settings.py loaded successfully ---")
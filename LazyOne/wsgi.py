@@ -15,3 +15,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LazyOne.settings')
 
 # Vercel expects this variable to be named `app`.
 app = get_wsgi_application()
+
+# Pay for URL resolution and template compilation during the cold start instead of on the
+# first request. Set DJANGO_WARMUP=False to skip it.
+if os.getenv('DJANGO_WARMUP', 'True') == 'True':
+    from basic.warmup import warmup
+
+    warmup()
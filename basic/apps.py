@@ -3,3 +3,15 @@ from django.apps import AppConfig
 class BasicConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'basic'
+
+    def ready(self):
+        from . import signals  # noqa: F401 (connects the signal receivers)
+
+    @property
+    def firestore_db(self):
+        """
+        The shared Firestore client (None when Firestore is not configured). See basic.firestore.
+        """
+        from .firestore import get_client
+
+        return get_client()
@@ -1,9 +1,8 @@
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth.models import User
-from firebase_admin import auth
 from .models import UserProfile
 import logging
-from .firebase_init import initialize_firebase # Import the new robust initializer
+from . import firebase_auth
 
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
@@ -12,17 +11,27 @@ class FirebaseBackend(BaseBackend):
     def authenticate(self, request, token=None):
         """
         Verifies a Firebase ID token and returns a Django user.
+        Verified tokens and uid -> user mappings are cached (see basic.firebase_auth), so
+        repeated logins with the same token skip both the signature check and the
+        get_or_create queries.
         """
-        initialize_firebase() # Ensure Firebase is initialized before any auth call
-
         if token is None:
             return None
 
         try:
-            decoded_token = auth.verify_id_token(token)
+            decoded_token = firebase_auth.verify_id_token(token)
             uid = decoded_token['uid']
             email = decoded_token.get('email')
 
+            # Same session, same Firebase user: nothing to look up.
+            current_user = getattr(request, 'user', None)
+            if current_user is not None and current_user.is_authenticated and current_user.id == firebase_auth.cached_user_id(uid):
+                return current_user
+
+            user = self._cached_user(uid)
+            if user is not None:
+                return user
+
             if not email:
                 logger.error("Firebase token decoded, but email was not present.")
                 return None
@@ -40,8 +49,9 @@ class FirebaseBackend(BaseBackend):
             
             if not profile.firebase_uid:
                 profile.firebase_uid = uid
-                profile.save()
-            
+                profile.save(update_fields=['firebase_uid', 'rewards'])
+
+            firebase_auth.remember_user_id(uid, user.id)
             return user
 
         except Exception as e:
@@ -49,6 +59,16 @@ class FirebaseBackend(BaseBackend):
             logger.error(f"Exception during Firebase token verification: {e}")
             return None
 
+    def _cached_user(self, uid):
+        user_id = firebase_auth.cached_user_id(uid)
+        if user_id is None:
+            return None
+        try:
+            return User.objects.get(pk=user_id)
+        except User.DoesNotExist:
+            firebase_auth.forget_uid(uid)
+            return None
+
     def get_user(self, user_id):
         """
         Required method for a Django auth backend.
@@ -0,0 +1,137 @@
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from . import inbox, membership, notifications, realtime
+from .models import Conversation, Message, Notification
+from .pagination import keyset_page
+from .search import search_messages
+
+MAX_MESSAGE_LENGTH = 4000
+HISTORY_PAGE_SIZE = 50
+SEARCH_PAGE_SIZE = 20
+
+
+def get_or_create_direct(user, other_user):
+    """
+    Returns the direct conversation between two users, creating it if needed. Concurrent
+    calls for the same pair are settled by the unique direct_key: the loser of the race
+    picks up the winner's conversation.
+    """
+    key = Conversation.direct_key_for(user.id, other_user.id)
+    conversation = Conversation.objects.filter(direct_key=key).first()
+    if conversation is not None:
+        return conversation
+    try:
+        with transaction.atomic():
+            conversation = Conversation.objects.create(direct_key=key)
+            conversation.participants.add(user, other_user)
+            inbox.sync_conversation(conversation, list(dict.fromkeys([user, other_user])))
+    except IntegrityError:
+        conversation = Conversation.objects.get(direct_key=key)
+    return conversation
+
+
+def serialize_message(message):
+    return {
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'sender': message.sender.username,
+        'content': message.content,
+        'timestamp': message.timestamp.isoformat(),
+    }
+
+
+def persist_messages(conversation, sender, contents):
+    """
+    Stores a batch of messages from one sender and does all the bookkeeping in one pass:
+    one bulk INSERT for the messages, one UPDATE for last_message_at, one inbox update and
+    one coalesced notification per recipient. Once committed, the messages are broadcast to
+    everyone connected to the conversation. Returns the saved messages.
+    """
+    participant_ids = membership.participant_ids(conversation.id)
+    now = timezone.now()
+    with notifications.batch(), transaction.atomic():
+        saved = Message.objects.bulk_create([
+            Message(conversation=conversation, sender=sender, content=content) for content in contents
+        ])
+        Conversation.objects.filter(id=conversation.id).update(last_message_at=now)
+        conversation.last_message_at = now
+        inbox.record_message(conversation, sender, participant_ids, now, count=len(saved), last_message=saved[-1])
+        notifications.notify_many(
+            [user_id for user_id in participant_ids if user_id != sender.id],
+            message=f"New message from {sender.username}",
+            link=reverse('chat_view', args=[conversation.id]),
+            target=(Notification.TARGET_CONVERSATION, conversation.id),
+            coalesce=True,
+        )
+        for message in saved:
+            message.sender = sender
+        transaction.on_commit(lambda: broadcast_messages(conversation.id, saved))
+    return saved
+
+
+def broadcast_messages(conversation_id, messages):
+    realtime.send_to_groups([
+        (realtime.conversation_group(conversation_id), {
+            'type': 'chat.message',
+            'message': serialize_message(message),
+        })
+        for message in messages
+    ])
+
+
+def mark_read(user, conversation, message_id=None):
+    """
+    Marks the conversation read up to `message_id` (default: everything) for `user`, clears
+    their notifications about it, and tells the room so senders see the read receipt.
+    """
+    watermark = inbox.mark_read(user, conversation, message_id)
+    notifications.mark_target_read(user.id, Notification.TARGET_CONVERSATION, conversation.id)
+    if watermark is not None:
+        transaction.on_commit(lambda: realtime.send_to_groups([
+            (realtime.conversation_group(conversation.id), {
+                'type': 'chat.read',
+                'user_id': user.id,
+                'message_id': watermark[0],
+            }),
+        ]))
+    return watermark
+
+
+def history_page(conversation, cursor=None, page_size=HISTORY_PAGE_SIZE):
+    """
+    One page of a conversation's history, newest message first, plus the cursor for the
+    page of older messages before it.
+    """
+    return keyset_page(
+        conversation.messages.select_related('sender'),
+        cursor=cursor,
+        page_size=page_size,
+        ordering=('-timestamp', '-id'),
+    )
+
+
+def messages_after(conversation, message_id, limit=HISTORY_PAGE_SIZE):
+    """
+    Up to `limit` messages newer than `message_id`, oldest first. Pages use this to poll for
+    new messages when the chat WebSocket is not available.
+    """
+    return list(
+        conversation.messages.filter(id__gt=message_id).select_related('sender').order_by('timestamp', 'id')[:limit]
+    )
+
+
+def search_page(user, query, cursor=None, page_size=SEARCH_PAGE_SIZE):
+    """
+    One page of the messages matching `query` in the conversations `user` takes part in,
+    newest first, plus the cursor for the next page.
+    """
+    conversation_ids = Conversation.participants.through.objects.filter(user=user).values('conversation_id')
+    messages = Message.objects.filter(conversation_id__in=conversation_ids).select_related('sender', 'conversation__task')
+    return keyset_page(
+        search_messages(messages, query),
+        cursor=cursor,
+        page_size=page_size,
+        ordering=('-timestamp', '-id'),
+    )
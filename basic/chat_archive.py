@@ -0,0 +1,159 @@
+import fcntl
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import ChatArchiveSegment, Conversation, Message
+from .pagination import keyset_page
+
+logger = logging.getLogger(__name__)
+
+# Segment files are relative to ARCHIVE_ROOT; each archive_chats run appends to the day's file.
+ARCHIVE_DIR = Path('chats')
+ARCHIVABLE_TASK_STATUSES = ('completed', 'cancelled')
+
+
+def archivable_conversations(cutoff):
+    """
+    Conversations of finished tasks with no activity since `cutoff` that still have messages
+    in the hot table.
+    """
+    return Conversation.objects.filter(
+        task__status__in=ARCHIVABLE_TASK_STATUSES,
+        last_message_at__lt=cutoff,
+    ).filter(
+        Exists(Message.objects.filter(conversation=OuterRef('pk')))
+    ).order_by('id')
+
+
+def segment_path(now=None):
+    return str(ARCHIVE_DIR / f"chats-{now or timezone.now():%Y%m%d}.jsonl.gz")
+
+
+def _archive_line(row):
+    return json.dumps({
+        'id': row['id'],
+        'conversation_id': row['conversation_id'],
+        'sender_id': row['sender_id'],
+        'sender': row['sender__username'],
+        'content': row['content'],
+        'timestamp': row['timestamp'].isoformat(),
+    }) + '\n'
+
+
+def _append_member(full_path, staging):
+    """
+    Appends the contents of `staging` to the segment file under an exclusive lock, syncs it
+    to disk and returns the (offset, length) it was written at.
+    """
+    with open(full_path, 'ab') as segment_file:
+        fcntl.flock(segment_file.fileno(), fcntl.LOCK_EX)
+        try:
+            offset = segment_file.seek(0, os.SEEK_END)
+            shutil.copyfileobj(staging, segment_file)
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+            return offset, segment_file.tell() - offset
+        finally:
+            fcntl.flock(segment_file.fileno(), fcntl.LOCK_UN)
+
+
+def archive_conversation(conversation, batch_size=1000, path=None):
+    """
+    Moves all of a conversation's messages into a new gzip member appended to the segment
+    file, then records the segment and deletes the messages in one transaction. The file
+    is synced to disk before anything is deleted, so a crash can at worst leave unreferenced
+    bytes behind. Returns the ChatArchiveSegment, or None when there was nothing to move.
+    """
+    messages = Message.objects.filter(conversation=conversation)
+    upper = messages.order_by('-id').values_list('id', flat=True).first()
+    if upper is None:
+        return None
+    # Messages sent while the segment is being written stay in the hot table.
+    messages = messages.filter(id__lte=upper)
+
+    path = path or segment_path()
+    full_path = Path(settings.ARCHIVE_ROOT) / path
+    full_path.parent.mkdir(parents=True, exist_ok=True)
+
+    count, first_at, last_at = 0, None, None
+    # The member is compressed into a temporary file first, then appended to the segment
+    # file in one go under an exclusive lock, so concurrent runs writing the same day's file
+    # never interleave their bytes.
+    with tempfile.TemporaryFile(dir=full_path.parent) as staging:
+        with gzip.GzipFile(fileobj=staging, mode='wb') as member:
+            after = 0
+            while True:
+                rows = list(messages.filter(id__gt=after).order_by('id').values(
+                    'id', 'conversation_id', 'sender_id', 'sender__username', 'content', 'timestamp'
+                )[:batch_size])
+                if not rows:
+                    break
+                member.write(''.join(_archive_line(row) for row in rows).encode('utf-8'))
+                timestamps = [row['timestamp'] for row in rows]
+                first_at = min([first_at, *timestamps] if first_at else timestamps)
+                last_at = max([last_at, *timestamps] if last_at else timestamps)
+                count += len(rows)
+                after = rows[-1]['id']
+        staging.seek(0)
+        offset, length = _append_member(full_path, staging)
+
+    with transaction.atomic():
+        # Serializes runs archiving the same conversation: only the first one to get here keeps
+        # its segment (the others leave unreferenced bytes in the file).
+        Conversation.objects.select_for_update().filter(id=conversation.id).exists()
+        if not count or not messages.exists():
+            return None
+        segment = ChatArchiveSegment.objects.create(
+            conversation=conversation, path=path, offset=offset, length=length,
+            message_count=count, first_message_at=first_at, last_message_at=last_at,
+        )
+        while True:
+            ids = list(messages.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            Message.objects.filter(id__in=ids).delete()
+    return segment
+
+
+def read_segment(segment):
+    """
+    The archived messages of one segment, oldest first, in the same shape as
+    basic.chat.serialize_message. A segment whose file is missing or damaged is logged and
+    reads as empty, so the rest of the history stays reachable.
+    """
+    try:
+        with open(Path(settings.ARCHIVE_ROOT) / segment.path, 'rb') as segment_file:
+            segment_file.seek(segment.offset)
+            data = segment_file.read(segment.length)
+        lines = gzip.decompress(data).decode('utf-8').splitlines()
+    except (FileNotFoundError, EOFError, gzip.BadGzipFile) as e:
+        logger.error(f"Could not read chat archive segment {segment.id} ({segment.path}): {e}")
+        return []
+    return [json.loads(line) for line in lines]
+
+
+def archive_page(conversation_id, cursor=None):
+    """
+    One segment's worth of archived history, newest message first, plus the cursor for the
+    next (older) segment.
+    """
+    segments, next_cursor = keyset_page(
+        ChatArchiveSegment.objects.filter(conversation_id=conversation_id),
+        cursor=cursor,
+        page_size=1,
+        ordering=('-last_message_at', '-id'),
+    )
+    messages = []
+    for segment in segments:
+        messages.extend(reversed(read_segment(segment)))
+    return messages, next_cursor
@@ -1,2 +1,125 @@
-# This file is no longer used after migrating to Firestore for real-time chat.
-# The project now runs using the standard wsgi.py for HTTP requests.
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from . import chat, membership
+from .models import Conversation
+from .realtime import conversation_group, user_group
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Streams new notifications and unread-count changes to the signed-in user.
+    Events are published by basic.realtime.
+    """
+
+    async def connect(self):
+        user = self.scope['user']
+        if not user.is_authenticated:
+            await self.close()
+            return
+        self.group_name = user_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def notification_event(self, event):
+        await self.send_json({
+            'type': 'notification',
+            'message': event['message'],
+            'link': event['link'],
+            'unread_count': event['unread_count'],
+        })
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Live chat for one conversation. Incoming messages are buffered briefly and persisted in
+    batches by basic.chat.persist_messages, which also broadcasts them to the room.
+    """
+
+    FLUSH_DELAY = 0.05  # seconds a message may wait for others to share its write
+    MAX_BATCH = 20
+
+    async def connect(self):
+        user = self.scope['user']
+        self.conversation_id = self.scope['url_route']['kwargs']['conversation_id']
+        if not user.is_authenticated or not await self._is_participant(user):
+            await self.close()
+            return
+        self.pending = []
+        self.flush_handle = None
+        self.group_name = conversation_group(self.conversation_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.flush()
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if not isinstance(content, dict):
+            return
+        if content.get('type') == 'read':
+            if isinstance(content.get('message_id'), int):
+                await self._mark_read(content['message_id'])
+            return
+        text = content.get('content')
+        if not isinstance(text, str) or not text.strip():
+            return
+        if len(text) > chat.MAX_MESSAGE_LENGTH:
+            await self.send_json({'type': 'error', 'error': 'Message is too long.'})
+            return
+        self.pending.append(text)
+        if len(self.pending) >= self.MAX_BATCH:
+            await self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(
+                self.FLUSH_DELAY, lambda: asyncio.ensure_future(self._timed_flush())
+            )
+
+    async def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        contents, self.pending = self.pending, []
+        if contents:
+            await self._persist(contents)
+
+    async def _timed_flush(self):
+        # Runs as a task of its own, so nobody awaits it: a failed write has to be reported
+        # here or it is lost silently.
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception(f"Could not save chat messages in conversation {self.conversation_id}")
+            await self.send_json({'type': 'error', 'error': 'Your message could not be sent.'})
+
+    async def chat_message(self, event):
+        await self.send_json({'type': 'message', 'message': event['message']})
+
+    async def chat_read(self, event):
+        await self.send_json({'type': 'read', 'user_id': event['user_id'], 'message_id': event['message_id']})
+
+    @database_sync_to_async
+    def _is_participant(self, user):
+        return membership.is_participant(user, self.conversation_id)
+
+    @database_sync_to_async
+    def _persist(self, contents):
+        # Membership is re-checked per batch (one cache read) in case the user was removed.
+        if membership.is_participant(self.scope['user'], self.conversation_id):
+            conversation = Conversation.objects.select_related('task').get(id=self.conversation_id)
+            chat.persist_messages(conversation, self.scope['user'], contents)
+
+    @database_sync_to_async
+    def _mark_read(self, message_id):
+        chat.mark_read(self.scope['user'], Conversation(id=self.conversation_id), message_id)
@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
 
 def firebase_keys(request):
     """
@@ -16,8 +17,18 @@ def firebase_keys(request):
 def unread_notifications_count(request):
     """
     Returns the number of unread notifications for the current user.
+    Reads the denormalized counter off the profile, which base.html loads anyway.
     """
     if request.user.is_authenticated:
-        count = request.user.notifications.filter(is_read=False).count()
+        try:
+            count = request.user.userprofile.unread_notifications
+        except ObjectDoesNotExist:
+            count = 0
         return {'unread_notifications_count': count}
     return {'unread_notifications_count': 0}
+
+def realtime(request):
+    """
+    Tells templates whether WebSockets are served (see REALTIME_WEBSOCKETS).
+    """
+    return {'REALTIME_WEBSOCKETS': settings.REALTIME_WEBSOCKETS}
@@ -0,0 +1,62 @@
+from .models import FriendRequest, UserProfile
+from .pagination import keyset_page
+
+DIRECTORY_PAGE_SIZE = 20
+DIRECTORY_ORDERING = ('user__username', 'id')
+DIRECTORY_FIELDS = ('id', 'user_id', 'user__username', 'first_name', 'last_name', 'college', 'major', 'batch')
+
+
+def candidates(user):
+    """
+    Profiles the user could send a friend request to: everyone except themselves, their
+    friends and anyone they have a pending request with. The exclusions are subqueries, so
+    the database does the filtering however many friends or requests the user has.
+    """
+    friends = UserProfile.friends.through.objects.filter(from_userprofile__user=user).values('to_userprofile_id')
+    sent = FriendRequest.objects.filter(from_user=user).values('to_user_id')
+    received = FriendRequest.objects.filter(to_user=user).values('from_user_id')
+    return UserProfile.objects.exclude(user=user).exclude(
+        id__in=friends
+    ).exclude(
+        user_id__in=sent
+    ).exclude(
+        user_id__in=received
+    )
+
+
+def directory_page(user, college='', major='', batch=None, prefix='', cursor=None, page_size=DIRECTORY_PAGE_SIZE):
+    """
+    One page of the user directory in username order, as small dicts (see serialize_entry).
+    Raises InvalidCursor for a bad cursor.
+    """
+    profiles = candidates(user)
+    if college:
+        profiles = profiles.filter(college=college)
+    if major:
+        profiles = profiles.filter(major=major)
+    if batch is not None:
+        profiles = profiles.filter(batch=batch)
+    if prefix:
+        profiles = profiles.filter(user__username__istartswith=prefix)
+    return keyset_page(
+        profiles.values(*DIRECTORY_FIELDS),
+        cursor=cursor,
+        page_size=page_size,
+        ordering=DIRECTORY_ORDERING,
+    )
+
+
+def display_name(row):
+    name = f"{row['first_name']} {row['last_name']}".strip()
+    return name or row['user__username'].split('@')[0]
+
+
+def serialize_entry(row):
+    return {
+        'user_id': row['user_id'],
+        'username': row['user__username'],
+        'name': display_name(row),
+        'college': row['college'],
+        'major': row['major'],
+        'batch': row['batch'],
+    }
@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+
+from .firebase_init import initialize_firebase
+
+# firebase_admin (and the google-auth stack under it) is imported inside the functions that
+# need it, so importing this module stays cheap on cold starts.
+
+logger = logging.getLogger(__name__)
+
+CERT_REFRESH_INTERVAL = 5 * 60  # seconds between background checks of Google's signing certs
+UID_CACHE_TIMEOUT = 60 * 60 * 24
+
+_refresh_lock = threading.Lock()
+_refresh_thread = None
+
+
+def _token_key(token):
+    # Tokens are bearer credentials, so only their hash is ever used as a key.
+    return 'firebase:token:' + hashlib.sha256(token.encode()).hexdigest()
+
+
+def verify_id_token(token):
+    """
+    Cached version of firebase_admin.auth.verify_id_token. Verified claims are cached under
+    the token's hash until the token expires, so repeat verifications of the same token skip
+    the signature check. Raises whatever verify_id_token raises for bad tokens.
+    """
+    key = _token_key(token)
+    claims = cache.get(key)
+    if claims is not None and claims.get('exp', 0) > time.time():
+        return claims
+
+    from firebase_admin import auth
+
+    initialize_firebase()
+    start_certificate_refresh()
+    claims = auth.verify_id_token(token)
+    ttl = int(claims.get('exp', 0) - time.time())
+    if ttl > 0:
+        cache.set(key, claims, ttl)
+    return claims
+
+
+# Where Google publishes the ID token signing certificates (firebase_admin's ID_TOKEN_CERT_URI).
+ID_TOKEN_CERT_URI = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+
+
+def _certificate_request():
+    """
+    The HTTP request callable that verify_id_token fetches certificates with. The verifier
+    keeps them in its own HTTP-cached session, and fetching through that same session is what
+    keeps them warm. That session is private firebase_admin API (checked against 7.7.0), so
+    if it is missing a plain google-auth request is used instead, which only warms the HTTP
+    connection, not the verifier's cache.
+    """
+    import firebase_admin
+    from firebase_admin import auth
+
+    try:
+        return auth._get_client(firebase_admin.get_app())._token_verifier.request
+    except AttributeError:
+        from google.auth.transport.requests import Request
+
+        logger.info("firebase_admin has no token verifier session; refreshing certificates with a plain request.")
+        return Request()
+
+
+def _refresh_certificates():
+    while True:
+        try:
+            _certificate_request()(ID_TOKEN_CERT_URI)
+        except Exception as e:
+            logger.warning(f"Could not refresh Firebase signing certificates: {e}")
+        time.sleep(CERT_REFRESH_INTERVAL)
+
+
+def start_certificate_refresh():
+    """
+    Starts (once per process) a daemon thread that fetches Google's token signing
+    certificates ahead of time and re-fetches them every CERT_REFRESH_INTERVAL, so most
+    requests find them cached. A request can still wait on a download when the cached
+    certificates expire between two refreshes.
+    """
+    import firebase_admin
+
+    global _refresh_thread
+    if _refresh_thread is not None or not firebase_admin._apps:
+        return
+    with _refresh_lock:
+        if _refresh_thread is None:
+            _refresh_thread = threading.Thread(
+                target=_refresh_certificates, name='firebase-cert-refresh', daemon=True
+            )
+            _refresh_thread.start()
+
+
+def _uid_key(uid):
+    return f'firebase:uid:{uid}'
+
+
+def cached_user_id(uid):
+    return cache.get(_uid_key(uid))
+
+
+def remember_user_id(uid, user_id):
+    cache.set(_uid_key(uid), user_id, UID_CACHE_TIMEOUT)
+
+
+def forget_uid(uid):
+    cache.delete(_uid_key(uid))
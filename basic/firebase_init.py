@@ -1,5 +1,3 @@
-import firebase_admin
-from firebase_admin import credentials
 import os
 import json
 
@@ -7,7 +5,12 @@ def initialize_firebase():
     """
     A robust, idempotent function to initialize the Firebase Admin SDK.
     It initializes directly from environment variables, avoiding filesystem issues in serverless environments.
+    The SDK is imported here rather than at module level, since it is slow to import and most
+    cold starts never need it.
     """
+    import firebase_admin
+    from firebase_admin import credentials
+
     # If the app is already initialized, do nothing.
     if firebase_admin._apps:
         return
@@ -0,0 +1,66 @@
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+from .firebase_init import initialize_firebase
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_client = None
+_created = False
+
+
+def _create_client():
+    # Imported here: the Firestore SDK pulls in gRPC, which is slow to import and must not be
+    # initialised before a pre-forking server (gunicorn) forks its workers.
+    if settings.FIRESTORE_EMULATOR_HOST:
+        from google.auth.credentials import AnonymousCredentials
+        from google.cloud import firestore
+
+        os.environ['FIRESTORE_EMULATOR_HOST'] = settings.FIRESTORE_EMULATOR_HOST
+        logger.info(f"Using the Firestore emulator at {settings.FIRESTORE_EMULATOR_HOST}.")
+        return firestore.Client(
+            project=settings.FIRESTORE_EMULATOR_PROJECT_ID, credentials=AnonymousCredentials()
+        )
+
+    import firebase_admin
+    from firebase_admin import firestore
+
+    initialize_firebase()
+    if not firebase_admin._apps:
+        logger.warning("Firebase is not configured; Firestore sync is disabled.")
+        return None
+    return firestore.client()
+
+
+def get_client():
+    """
+    The process-wide Firestore client, created on first use. The client (and the gRPC
+    channel under it) is thread-safe and reused by every request and worker thread.
+    Returns None when Firestore is not configured.
+    """
+    global _client, _created
+    if not _created:
+        with _lock:
+            if not _created:
+                try:
+                    _client = _create_client()
+                except Exception as e:
+                    # Not remembered: the next call tries again, so a transient failure
+                    # doesn't disable Firestore for the rest of the process.
+                    logger.error(f"Could not create the Firestore client: {e}")
+                    return None
+                _created = True
+    return _client
+
+
+def reset_client():
+    """
+    Drops the cached client so the next get_client() builds a new one (tests, settings changes).
+    """
+    global _client, _created
+    with _lock:
+        _client, _created = None, False
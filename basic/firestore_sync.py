@@ -0,0 +1,176 @@
+import logging
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .firestore import get_client
+from .models import FirestoreSyncOutbox
+
+logger = logging.getLogger(__name__)
+
+# --- Firestore sync outbox ---
+# Views never talk to Firestore. They call enqueue() (normally through sync_user_profile) in
+# the same transaction as the model change, and the drain_firestore_sync worker sends the
+# writes in Firestore batches. Repeated changes to one document collapse into a single
+# pending write, and failed batches are retried with exponential backoff.
+
+MAX_BATCH_SIZE = 500  # Firestore's limit on writes per batch commit
+MAX_ATTEMPTS = 10  # after this, a row stays in the outbox (with last_error) for inspection
+BASE_BACKOFF = 5  # seconds, doubled on every failed attempt
+MAX_BACKOFF = 60 * 60
+LEASE = timedelta(minutes=2)  # how long a claimed row is hidden from other workers
+
+USER_COLLECTION = 'users'
+USER_PROFILE_FIELDS = (
+    'first_name', 'last_name', 'bio', 'college', 'major', 'roll_no', 'batch',
+    'phone_number', 'is_phone_verified', 'instagram_username',
+)
+
+
+def enqueue(collection, document_id, data):
+    """
+    Queues a merge-write of `data` into collection/document_id, folding it into the
+    document's pending write if there is one. Call it inside the transaction that makes the
+    change, so the write is queued if and only if the change commits.
+    """
+    with transaction.atomic():
+        entry, created = FirestoreSyncOutbox.objects.select_for_update().get_or_create(
+            collection=collection, document_id=document_id, defaults={'data': data},
+        )
+        if not created:
+            entry.data = {**entry.data, **data}
+            entry.version = F('version') + 1
+            # A fresh change gets a fresh set of attempts, so documents that hit MAX_ATTEMPTS
+            # are not stuck forever. Rows with attempts = 0 are either already due or in
+            # flight, and the latter must keep their lease (drain releases them afterwards).
+            if entry.attempts:
+                entry.next_attempt_at = timezone.now()
+            entry.attempts = 0
+            entry.last_error = ''
+            entry.save(update_fields=['data', 'version', 'attempts', 'last_error', 'next_attempt_at'])
+
+
+def user_document(row):
+    """
+    The Firestore `users` document for a profile, from a values() row containing
+    USER_PROFILE_FIELDS and user__username.
+    """
+    data = {field: row[field] for field in USER_PROFILE_FIELDS}
+    data['username'] = row['user__username']
+    return data
+
+
+def sync_user_profile(profile, fields=USER_PROFILE_FIELDS):
+    """
+    Queues the given profile fields for the user's Firestore document. Profiles without a
+    Firebase uid have no document and are skipped.
+    """
+    if not profile.firebase_uid:
+        return
+    data = {field: getattr(profile, field) for field in fields}
+    if fields is USER_PROFILE_FIELDS:
+        data['username'] = profile.user.username
+    enqueue(USER_COLLECTION, profile.firebase_uid, data)
+
+
+def _backoff(attempts):
+    """
+    Delay before the next try after `attempts` failures: BASE_BACKOFF, then doubling.
+    """
+    return timedelta(seconds=min(BASE_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF))
+
+
+def _claim(batch_size):
+    """
+    Picks the next due rows and leases them, so concurrent workers never send the same
+    rows and the Firestore round trip happens outside any database transaction.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = FirestoreSyncOutbox.objects.filter(
+            next_attempt_at__lte=now, attempts__lt=MAX_ATTEMPTS
+        ).order_by('next_attempt_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        entries = list(due[:batch_size])
+        FirestoreSyncOutbox.objects.filter(id__in=[e.id for e in entries]).update(next_attempt_at=now + LEASE)
+    return entries
+
+
+def drain(batch_size=MAX_BATCH_SIZE):
+    """
+    Sends one batch of pending writes as a single Firestore batch commit and returns how
+    many documents it covered. Rows changed while the batch was in flight keep their newer
+    data and are sent again right away; a failed commit is retried later with backoff.
+    """
+    db = get_client()
+    if db is None:
+        return 0
+    entries = _claim(min(batch_size, MAX_BATCH_SIZE))
+    if not entries:
+        return 0
+
+    try:
+        batch = db.batch()
+        for entry in entries:
+            batch.set(db.collection(entry.collection).document(entry.document_id), entry.data, merge=True)
+        batch.commit()
+    except Exception as e:
+        logger.warning(f"Firestore sync batch of {len(entries)} writes failed: {e}")
+        now = timezone.now()
+        for entry in entries:
+            entry.attempts += 1
+            entry.next_attempt_at = now + _backoff(entry.attempts)
+            entry.last_error = str(e)[:1000]
+        FirestoreSyncOutbox.objects.bulk_update(entries, ['attempts', 'next_attempt_at', 'last_error'])
+        return len(entries)
+
+    sent = reduce(or_, (Q(id=entry.id, version=entry.version) for entry in entries))
+    FirestoreSyncOutbox.objects.filter(sent).delete()
+    # Whatever is left was updated mid-flight: release the lease so it goes out next.
+    FirestoreSyncOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(
+        next_attempt_at=timezone.now(), attempts=0, last_error=''
+    )
+    return len(entries)
+
+
+# --- Reconciliation ---
+# Used by the reconcile_firestore_users command. Django is the source of truth: documents
+# that are missing or differ get the Django values written over them.
+
+def diff_user_documents(db, rows):
+    """
+    Fetches the Firestore documents of a chunk of profile rows with one get_all() call and
+    returns {firebase_uid: fields that need writing} for the ones that drifted.
+    """
+    collection = db.collection(USER_COLLECTION)
+    expected = {row['firebase_uid']: user_document(row) for row in rows}
+    refs = [collection.document(uid) for uid in expected]
+    corrections = {}
+    for snapshot in db.get_all(refs):
+        wanted = expected[snapshot.id]
+        actual = snapshot.to_dict() if snapshot.exists else None
+        if actual is None:
+            corrections[snapshot.id] = wanted
+            continue
+        changed = {field: value for field, value in wanted.items() if actual.get(field) != value}
+        if changed:
+            corrections[snapshot.id] = changed
+    return corrections
+
+
+def write_corrections(db, corrections):
+    """
+    Merge-writes {firebase_uid: fields} into the users collection, MAX_BATCH_SIZE per commit.
+    """
+    collection = db.collection(USER_COLLECTION)
+    items = list(corrections.items())
+    for start in range(0, len(items), MAX_BATCH_SIZE):
+        batch = db.batch()
+        for uid, data in items[start:start + MAX_BATCH_SIZE]:
+            batch.set(collection.document(uid), data, merge=True)
+        batch.commit()
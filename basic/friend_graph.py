@@ -0,0 +1,92 @@
+from django.core.cache import cache
+
+from .models import Friendship, UserProfile
+
+MAX_NODES = 100
+CACHE_TIMEOUT = 60 * 10
+GENERATION_KEY = 'friend_graph:generation'
+
+NODE_FIELDS = ('user_id', 'user__username', 'phone_number', 'is_phone_verified', 'instagram_username')
+# UserProfile fields that end up in a node; saves touching only other fields leave graphs alone.
+PROFILE_NODE_FIELDS = frozenset(('user', 'user_id', 'phone_number', 'is_phone_verified', 'instagram_username'))
+
+
+def _node(row, closeness, prefix=''):
+    return {
+        'id': row[f'{prefix}user_id'],
+        'username': row[f'{prefix}user__username'],
+        'closeness': closeness,
+        'phone': row[f'{prefix}phone_number'],
+        'is_phone_verified': row[f'{prefix}is_phone_verified'],
+        'instagram': row[f'{prefix}instagram_username'],
+    }
+
+
+def build_user_nodes(user_profile, max_nodes=MAX_NODES):
+    """
+    Builds the friend-circle payload for the home page: all of the user's friends, closest
+    first, then other users to fill the graph up to `max_nodes`. Uses exactly two queries
+    regardless of how many friends the user has.
+    """
+    # Every friend is included, even past max_nodes; the cap only limits the filler users.
+    friend_rows = Friendship.objects.filter(from_user=user_profile).order_by('-closeness', 'id').values(
+        'closeness', *(f'to_user__{field}' for field in NODE_FIELDS)
+    )
+    user_nodes = [_node(row, row['closeness'], prefix='to_user__') for row in friend_rows]
+
+    if len(user_nodes) < max_nodes:
+        friend_profiles = Friendship.objects.filter(from_user=user_profile).values('to_user_id')
+        other_rows = UserProfile.objects.exclude(
+            id__in=friend_profiles
+        ).exclude(
+            id=user_profile.id
+        ).order_by('id').values(*NODE_FIELDS)[:max_nodes - len(user_nodes)]
+        user_nodes.extend(_node(row, 0) for row in other_rows)
+
+    return user_nodes
+
+
+def _cache_key(profile_id):
+    # Bumping the generation (see invalidate_all) orphans every user's cached snapshot at once.
+    generation = cache.get_or_set(GENERATION_KEY, 1, None)
+    return f'friend_graph:nodes:{generation}:{profile_id}'
+
+
+def get_user_nodes(user_profile):
+    """
+    Cached version of build_user_nodes, keyed per user profile.
+    """
+    key = _cache_key(user_profile.id)
+    user_nodes = cache.get(key)
+    if user_nodes is None:
+        user_nodes = build_user_nodes(user_profile)
+        cache.set(key, user_nodes, CACHE_TIMEOUT)
+    return user_nodes
+
+
+def invalidate_profiles(*profile_ids):
+    cache.delete_many([_cache_key(profile_id) for profile_id in profile_ids])
+
+
+def invalidate_profile(user_profile):
+    """
+    Drops the snapshots a profile's node can appear in: its own, those of users who have it
+    as a friend and, if it is early enough in id order to be a filler node, everyone's.
+    """
+    # A filler node is one of the first max_nodes profiles by id once the viewer and their
+    # friends are skipped, so a profile with more than MAX_NODES profiles before it never is.
+    if not UserProfile.objects.filter(id__lt=user_profile.id)[MAX_NODES:MAX_NODES + 1].exists():
+        invalidate_all()
+        return
+    befriended_by = Friendship.objects.filter(to_user=user_profile).values_list('from_user_id', flat=True)
+    invalidate_profiles(user_profile.id, *befriended_by)
+
+
+def invalidate_all():
+    """
+    Drops every cached snapshot at once.
+    """
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, None)
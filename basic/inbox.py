@@ -0,0 +1,144 @@
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import InboxEntry, Message
+from .pagination import keyset_page
+
+INBOX_PAGE_SIZE = 20
+
+
+def other_party_name(user, participants):
+    return ', '.join(p.username for p in participants if p.id != user.id)
+
+
+def _upsert_entries(conversation, participants, last_message_at, unread_count=lambda participant: 0):
+    task_title = conversation.task.title if conversation.task_id else ''
+    InboxEntry.objects.bulk_create(
+        [
+            InboxEntry(
+                user=participant,
+                conversation=conversation,
+                other_party_name=other_party_name(participant, participants),
+                task_title=task_title,
+                last_message_at=last_message_at,
+                unread_count=unread_count(participant),
+            )
+            for participant in participants
+        ],
+        # Existing entries only get their display fields refreshed; their counters are kept.
+        update_conflicts=True,
+        unique_fields=['user', 'conversation'],
+        update_fields=['other_party_name', 'task_title'],
+    )
+
+
+def sync_conversation(conversation, participants=None):
+    """
+    Creates (or refreshes the display fields of) the inbox entry of every participant in a
+    single upsert. Call this after participants are added to a conversation.
+    """
+    if participants is None:
+        participants = list(conversation.participants.all())
+    _upsert_entries(conversation, participants, conversation.last_message_at)
+
+
+def record_message(conversation, sender, participant_ids, timestamp=None, count=1, last_message=None):
+    """
+    Moves the conversation to the top of every participant's inbox and bumps the unread
+    counter of everyone except the sender, in one UPDATE. The sender has read their own
+    messages, so when `last_message` is given their watermark moves up to it as well.
+    """
+    timestamp = timestamp or timezone.now()
+    changes = {
+        'last_message_at': timestamp,
+        'unread_count': Case(
+            When(user=sender, then=Value(0)),
+            default=F('unread_count') + count,
+        ),
+    }
+    if last_message is not None and last_message.pk:
+        changes['last_read_message'] = Case(
+            When(user=sender, then=Value(last_message.pk)), default=F('last_read_message'),
+            output_field=InboxEntry._meta.get_field('last_read_message'),
+        )
+        changes['last_read_at'] = Case(
+            When(user=sender, then=Value(last_message.timestamp)), default=F('last_read_at'),
+        )
+    updated = InboxEntry.objects.filter(conversation=conversation).update(**changes)
+    if updated < len(participant_ids):
+        # Conversations that predate the inbox get their missing entries created pre-counted.
+        participants = list(conversation.participants.all())
+        _upsert_entries(
+            conversation, participants, timestamp,
+            unread_count=lambda participant: 0 if participant.id == sender.id else count,
+        )
+        if 'last_read_message' in changes:
+            InboxEntry.objects.filter(conversation=conversation, user=sender).update(
+                last_read_message=last_message, last_read_at=last_message.timestamp,
+            )
+
+
+def _after(timestamp, message_id):
+    return Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=message_id)
+
+
+def count_unread(user, conversation, last_read_at=None, last_read_message_id=None):
+    """
+    Counts the messages from other participants after a watermark: a range scan on the
+    (conversation, timestamp, id) index. The maintained unread_count normally saves this.
+    """
+    unread = Message.objects.filter(conversation=conversation).exclude(sender=user)
+    if last_read_at is not None:
+        unread = unread.filter(_after(last_read_at, last_read_message_id))
+    return unread.count()
+
+
+def mark_read(user, conversation, message_id=None):
+    """
+    Moves the user's read watermark up to `message_id` (default: the latest message) with a
+    single UPDATE. The watermark never moves backwards. Returns the message the watermark now
+    points at as (id, timestamp), or None when nothing changed.
+    """
+    messages = Message.objects.filter(conversation=conversation).order_by('-timestamp', '-id')
+    latest = messages.values_list('id', 'timestamp').first()
+    if latest is None:
+        InboxEntry.objects.filter(user=user, conversation=conversation, unread_count__gt=0).update(unread_count=0)
+        return None
+    target = latest
+    if message_id is not None and message_id != latest[0]:
+        target = messages.filter(id=message_id).values_list('id', 'timestamp').first()
+        if target is None:
+            return None
+    read_id, read_at = target
+    unread = 0 if target == latest else count_unread(user, conversation, read_at, read_id)
+    behind = (
+        Q(last_read_at__isnull=True)
+        | Q(last_read_at__lt=read_at)
+        | Q(last_read_at=read_at, last_read_message_id__lt=read_id)
+    )
+    updated = InboxEntry.objects.filter(user=user, conversation=conversation).filter(behind).update(
+        last_read_message_id=read_id, last_read_at=read_at, unread_count=unread,
+    )
+    return target if updated else None
+
+
+def read_watermarks(conversation, exclude_user=None):
+    """
+    {user_id: last read message id} for the conversation's participants, for read receipts.
+    """
+    entries = InboxEntry.objects.filter(conversation=conversation, last_read_message__isnull=False)
+    if exclude_user is not None:
+        entries = entries.exclude(user=exclude_user)
+    return dict(entries.values_list('user_id', 'last_read_message_id'))
+
+
+def inbox_page(user, cursor=None, page_size=INBOX_PAGE_SIZE):
+    """
+    One page of the user's inbox, most recent conversation first.
+    """
+    return keyset_page(
+        InboxEntry.objects.filter(user=user),
+        cursor=cursor,
+        page_size=page_size,
+        ordering=('-last_message_at', '-id'),
+    )
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from basic.chat_archive import archivable_conversations, archive_conversation, segment_path
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves the messages of completed/cancelled task chats that have been idle past the "
+        "retention window into gzipped JSON lines segments under ARCHIVE_ROOT/chats/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHAT_ARCHIVE_AFTER_DAYS,
+                            help="Idle days before a finished chat is archived (default: CHAT_ARCHIVE_AFTER_DAYS).")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Messages read or deleted per query.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many chats would be archived.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        conversations = archivable_conversations(cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"{conversations.count()} chats idle since {cutoff:%Y-%m-%d} would be archived.")
+            return
+
+        path = segment_path()
+        chats = messages = 0
+        last_id = 0
+        while True:
+            # Fetched in chunks rather than streamed, since every chat is written to in between.
+            chunk = list(conversations.filter(id__gt=last_id)[:100])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            for conversation in chunk:
+                segment = archive_conversation(conversation, batch_size=options['batch_size'], path=path)
+                if segment:
+                    chats += 1
+                    messages += segment.message_count
+                    self.stdout.write(f"Archived {segment.message_count} messages of conversation {conversation.id}.")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {messages} messages from {chats} chats into {path}."))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from basic.firestore_sync import MAX_BATCH_SIZE, drain
+
+
+class Command(BaseCommand):
+    help = "Sends queued Firestore writes from the sync outbox in batched commits."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=MAX_BATCH_SIZE,
+                            help=f"Documents written per Firestore batch (at most {MAX_BATCH_SIZE}).")
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting once nothing is due.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep between polls when looping.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = drain(batch_size=options['batch_size'])
+            total += processed
+            if processed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} Firestore sync writes."))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from basic.notifications import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Fans out queued notifications from the outbox (used when NOTIFICATION_DELIVERY = 'outbox')."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Outbox events processed per transaction.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting once the outbox is empty.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep between polls when looping.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = drain_outbox(batch_size=options['batch_size'])
+            total += processed
+            if processed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Drained {total} outbox events."))
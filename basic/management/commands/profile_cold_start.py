@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is already imported: load the WSGI app exactly like
+# the serverless runtime does (which includes the warmup) and report how long it took.
+BOOTSTRAP = """
+import json, os, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LazyOne.settings')
+import LazyOne.wsgi
+print(json.dumps({'total_ms': (time.perf_counter() - started) * 1000}))
+"""
+
+
+def parse_importtime(output):
+    """
+    Parses `python -X importtime` output into [(module, self_us, cumulative_us)].
+    """
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures a cold start (importing LazyOne.wsgi in a fresh interpreter, warmup included), "
+        "lists the slowest imports and fails if it exceeds the COLD_START_BUDGET_MS target."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help="Number of imports to list.")
+        parser.add_argument('--sort', choices=('cumulative', 'self'), default='cumulative',
+                            help="Rank imports by time including (cumulative) or excluding (self) their own imports.")
+        parser.add_argument('--budget-ms', type=int, default=settings.COLD_START_BUDGET_MS,
+                            help="Cold-start target in milliseconds (default: COLD_START_BUDGET_MS).")
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOTSTRAP],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Cold start failed:\n{result.stderr[-2000:]}")
+        total_ms = json.loads(result.stdout.strip().splitlines()[-1])['total_ms']
+
+        rows = parse_importtime(result.stderr)
+        column = 1 if options['sort'] == 'self' else 2
+        rows.sort(key=lambda row: row[column], reverse=True)
+
+        self.stdout.write(f"{'self ms':>9} {'cumul ms':>9}  module")
+        for module, self_us, cumulative_us in rows[:options['top']]:
+            self.stdout.write(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {module}")
+
+        summary = f"Cold start took {total_ms:.0f} ms (budget {options['budget_ms']} ms, {len(rows)} modules imported)."
+        if total_ms > options['budget_ms']:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,67 @@
+import gzip
+import json
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from basic.models import Notification
+
+# Every column, so an archived row can be restored as it was.
+ARCHIVE_FIELDS = tuple(field.attname for field in Notification._meta.concrete_fields)
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes read notifications older than the retention window in batches, "
+        "optionally archiving them to gzipped JSON lines under ARCHIVE_ROOT first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+                            help="Retention window in days (default: NOTIFICATION_RETENTION_DAYS).")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows deleted per query.")
+        parser.add_argument('--archive', action='store_true', help="Write pruned rows to ARCHIVE_ROOT/notifications/.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many rows would be pruned.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        expired = Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"{expired.count()} read notifications older than {cutoff:%Y-%m-%d} would be pruned.")
+            return
+
+        archive = None
+        if options['archive']:
+            archive_dir = Path(settings.ARCHIVE_ROOT) / 'notifications'
+            archive_dir.mkdir(parents=True, exist_ok=True)
+            # Appending opens a new gzip member, which readers handle transparently.
+            archive = gzip.open(archive_dir / f"notifications-{timezone.now():%Y%m%d}.jsonl.gz", 'at', encoding='utf-8')
+
+        total = 0
+        last_id = 0
+        try:
+            while True:
+                # Each batch seeks past the last one on the primary key instead of rescanning
+                # the retained rows from the start.
+                batch = list(
+                    expired.filter(id__gt=last_id).order_by('id').values(*ARCHIVE_FIELDS)[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1]['id']
+                if archive:
+                    for row in batch:
+                        archive.write(json.dumps(row, default=str) + '\n')
+                    archive.flush()
+                Notification.objects.filter(id__in=[row['id'] for row in batch]).delete()
+                total += len(batch)
+                self.stdout.write(f"Pruned {total} notifications...")
+        finally:
+            if archive:
+                archive.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Pruned {total} read notifications older than {cutoff:%Y-%m-%d}."))
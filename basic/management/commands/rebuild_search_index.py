@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from basic.search import SEARCH_INDEXES
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-creates the full-text search indexes and re-indexes existing rows. "
+        "Run this on SQLite after a migration rebuilds an indexed table, since that drops the sync triggers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('indexes', nargs='*', help=f"Indexes to rebuild (default: all of {', '.join(SEARCH_INDEXES)}).")
+
+    def handle(self, *args, **options):
+        names = options['indexes'] or list(SEARCH_INDEXES)
+        unknown = set(names) - set(SEARCH_INDEXES)
+        if unknown:
+            raise CommandError(f"Unknown search index: {', '.join(sorted(unknown))}")
+
+        for name in names:
+            SEARCH_INDEXES[name].install(connection)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt '{name}' search index ({connection.vendor})."))
@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+
+from basic.firestore import get_client
+from basic.firestore_sync import MAX_BATCH_SIZE, USER_PROFILE_FIELDS, diff_user_documents, write_corrections
+from basic.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares every UserProfile with its Firestore users/{firebase_uid} document and writes "
+        "the Django values over missing or drifted documents."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=MAX_BATCH_SIZE,
+                            help=f"Profiles fetched per get_all() and written per batch (at most {MAX_BATCH_SIZE}).")
+        parser.add_argument('--workers', type=int, default=8, help="Chunks reconciled in parallel.")
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without writing anything.")
+
+    def handle(self, *args, **options):
+        db = get_client()
+        if db is None:
+            raise CommandError("Firestore is not configured.")
+        chunk_size = max(1, min(options['chunk_size'], MAX_BATCH_SIZE))
+        dry_run = options['dry_run']
+
+        def reconcile(rows):
+            corrections = diff_user_documents(db, rows)
+            if corrections and not dry_run:
+                write_corrections(db, corrections)
+            return len(rows), len(corrections)
+
+        self.checked = self.drifted = 0
+        self.started = time.monotonic()
+        # The database is only read from this thread; workers only talk to Firestore. At most
+        # two chunks per worker are in flight, so memory stays flat however many users exist.
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            pending = set()
+            for rows in self._chunks(chunk_size):
+                pending.add(executor.submit(reconcile, rows))
+                if len(pending) >= options['workers'] * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect(done)
+            self._collect(wait(pending).done)
+
+        verb = "would be corrected" if dry_run else "corrected"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {self.checked} profiles in {time.monotonic() - self.started:.1f}s; {self.drifted} {verb}."
+        ))
+
+    def _chunks(self, chunk_size):
+        profiles = UserProfile.objects.filter(firebase_uid__isnull=False).exclude(firebase_uid='')
+        last_id = 0
+        while True:
+            rows = list(
+                profiles.filter(id__gt=last_id).order_by('id')
+                .values('id', 'firebase_uid', 'user__username', *USER_PROFILE_FIELDS)[:chunk_size]
+            )
+            if not rows:
+                return
+            last_id = rows[-1]['id']
+            yield rows
+
+    def _collect(self, futures):
+        for future in futures:
+            checked, drifted = future.result()
+            self.checked += checked
+            self.drifted += drifted
+        rate = self.checked / max(time.monotonic() - self.started, 1e-6)
+        self.stdout.write(f"Checked {self.checked} profiles, {self.drifted} drifted ({rate:.0f}/s)...")
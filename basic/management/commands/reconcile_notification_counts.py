@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from basic.notifications import reconcile_unread_counts
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized unread-notification counters. Schedule it periodically to fix drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Profiles updated per query.")
+
+    def handle(self, *args, **options):
+        fixed = reconcile_unread_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Reconciled unread counters, {fixed} had drifted."))
@@ -0,0 +1,35 @@
+from django.core.cache import cache
+
+from .models import Conversation
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(conversation_id):
+    return f'chat:participants:{conversation_id}'
+
+
+def participant_ids(conversation_id):
+    """
+    The ids of a conversation's participants as a frozenset, cached per conversation so
+    authorizing a chat request or message costs one cache read. Unknown conversations have
+    no participants.
+    """
+    key = _cache_key(conversation_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            Conversation.participants.through.objects.filter(
+                conversation_id=conversation_id
+            ).values_list('user_id', flat=True)
+        )
+        cache.set(key, ids, CACHE_TIMEOUT)
+    return ids
+
+
+def is_participant(user, conversation_id):
+    return user.is_authenticated and user.id in participant_ids(conversation_id)
+
+
+def invalidate(*conversation_ids):
+    cache.delete_many([_cache_key(conversation_id) for conversation_id in conversation_ids])
@@ -0,0 +1,15 @@
+from . import notifications
+
+
+class NotificationBatchMiddleware:
+    """
+    Collects the notifications a request dispatches and writes them in one batch
+    once the view has finished.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with notifications.batch():
+            return self.get_response(request)
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from basic.search import TASK_INDEX
+
+
+def install_index(apps, schema_editor):
+    TASK_INDEX.install(schema_editor.connection)
+
+
+def uninstall_index(apps, schema_editor):
+    TASK_INDEX.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0043_task_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_index, uninstall_index),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+def backfill_inbox_entries(apps, schema_editor):
+    Conversation = apps.get_model('basic', 'Conversation')
+    Message = apps.get_model('basic', 'Message')
+    InboxEntry = apps.get_model('basic', 'InboxEntry')
+
+    entries = []
+    conversations = Conversation.objects.select_related('task').prefetch_related('participants')
+    for conversation in conversations.iterator(chunk_size=500):
+        participants = list(conversation.participants.all())
+        for participant in participants:
+            entries.append(InboxEntry(
+                user=participant,
+                conversation=conversation,
+                other_party_name=', '.join(p.username for p in participants if p.id != participant.id),
+                task_title=conversation.task.title if conversation.task_id else '',
+                last_message_at=conversation.last_message_at,
+                unread_count=Message.objects.filter(
+                    conversation=conversation, is_read=False
+                ).exclude(sender=participant).count(),
+            ))
+        if len(entries) >= 1000:
+            InboxEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+    InboxEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0045_inboxentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_inbox_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:34
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_counters(apps, schema_editor):
+    UserProfile = apps.get_model('basic', 'UserProfile')
+    Notification = apps.get_model('basic', 'Notification')
+    unread = Notification.objects.filter(
+        recipient_id=OuterRef('user_id'), is_read=False
+    ).order_by().values('recipient_id').annotate(count=Count('id')).values('count')
+    UserProfile.objects.update(
+        unread_notifications=Coalesce(Subquery(unread, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0046_backfill_inbox_entries'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='unread_notifications',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read'], name='notification_unread_idx'),
+        ),
+        migrations.RunPython(backfill_unread_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:36
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def compact_chat_notifications(apps, schema_editor):
+    """
+    Folds duplicate "New message from ..." notifications for the same chat into one row
+    per (recipient, link, read state), keeping the newest row.
+    """
+    Notification = apps.get_model('basic', 'Notification')
+    UserProfile = apps.get_model('basic', 'UserProfile')
+
+    duplicates = Notification.objects.filter(
+        link__startswith='/chat/', message__startswith='New message from'
+    ).values('recipient_id', 'link', 'is_read').annotate(
+        rows=Count('id'), total=Sum('count'), keep_id=Max('id')
+    ).filter(rows__gt=1).order_by()
+
+    for group in duplicates.iterator(chunk_size=1000):
+        Notification.objects.filter(id=group['keep_id']).update(count=group['total'])
+        Notification.objects.filter(
+            recipient_id=group['recipient_id'], link=group['link'], is_read=group['is_read'],
+            message__startswith='New message from', id__lt=group['keep_id'],
+        ).delete()
+
+    unread = Notification.objects.filter(
+        recipient_id=OuterRef('user_id'), is_read=False
+    ).order_by().values('recipient_id').annotate(count=Count('id')).values('count')
+    UserProfile.objects.update(
+        unread_notifications=Coalesce(Subquery(unread, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0048_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='coalesce',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(compact_chat_notifications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0050_notification_recent_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='target_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='target_type',
+            field=models.CharField(blank=True, choices=[('conversation', 'Conversation'), ('dispute', 'Dispute'), ('friends', 'Friends'), ('tasks', 'My Tasks')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='target_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='target_type',
+            field=models.CharField(blank=True, choices=[('conversation', 'Conversation'), ('dispute', 'Dispute'), ('friends', 'Friends'), ('tasks', 'My Tasks')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'target_type', 'target_id', 'is_read'], name='notification_target_idx'),
+        ),
+    ]
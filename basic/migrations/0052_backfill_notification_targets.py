@@ -0,0 +1,40 @@
+import re
+
+from django.db import migrations
+
+# Links produced by reverse() for each target type, as of this migration.
+ID_LINK_PATTERNS = {
+    'conversation': re.compile(r'^/chat/(\d+)/$'),
+    'dispute': re.compile(r'^/dispute/(\d+)/$'),
+}
+STATIC_LINKS = {
+    '/friends/': 'friends',
+    '/my_tasks/': 'tasks',
+}
+
+
+def backfill_targets(apps, schema_editor):
+    Notification = apps.get_model('basic', 'Notification')
+    untargeted = Notification.objects.filter(target_type='')
+
+    for link, target_type in STATIC_LINKS.items():
+        untargeted.filter(link=link).update(target_type=target_type)
+
+    for target_type, pattern in ID_LINK_PATTERNS.items():
+        prefix = pattern.pattern[1:pattern.pattern.index('(')]
+        links = untargeted.filter(link__startswith=prefix).values_list('link', flat=True).distinct().order_by()
+        for link in links.iterator(chunk_size=1000):
+            match = pattern.match(link)
+            if match:
+                untargeted.filter(link=link).update(target_type=target_type, target_id=int(match.group(1)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0051_notification_targets'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_targets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+from django.db.models import Q
+
+
+def backfill_read_watermarks(apps, schema_editor):
+    """
+    Derives each participant's watermark from the old per-message flags: the newest message
+    they either sent or received and marked read. The unread counter is recounted from it.
+    """
+    Message = apps.get_model('basic', 'Message')
+    InboxEntry = apps.get_model('basic', 'InboxEntry')
+
+    batch = []
+    for entry in InboxEntry.objects.order_by('id').iterator(chunk_size=500):
+        messages = Message.objects.filter(conversation_id=entry.conversation_id)
+        last_read = messages.filter(
+            Q(sender_id=entry.user_id) | Q(is_read=True)
+        ).order_by('-timestamp', '-id').values_list('id', 'timestamp').first()
+        unread = messages.exclude(sender_id=entry.user_id)
+        if last_read:
+            entry.last_read_message_id, entry.last_read_at = last_read
+            unread = unread.filter(
+                Q(timestamp__gt=entry.last_read_at) | Q(timestamp=entry.last_read_at, id__gt=entry.last_read_message_id)
+            )
+        entry.unread_count = unread.count()
+        batch.append(entry)
+        if len(batch) >= 500:
+            InboxEntry.objects.bulk_update(batch, ['last_read_message', 'last_read_at', 'unread_count'])
+            batch = []
+    InboxEntry.objects.bulk_update(batch, ['last_read_message', 'last_read_at', 'unread_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0054_inbox_read_watermark'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_read_watermarks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:42
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0055_backfill_read_watermarks'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+    ]
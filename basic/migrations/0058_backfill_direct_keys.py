@@ -0,0 +1,70 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Max
+
+
+def merge_inbox_entries(InboxEntry, keeper, duplicates):
+    """
+    Folds the participants' inbox entries of the duplicate conversations into the keeper's:
+    counters add up, and the latest activity and read watermark win.
+    """
+    entries = defaultdict(list)
+    for entry in InboxEntry.objects.filter(conversation__in=[keeper, *duplicates]):
+        entries[entry.user_id].append(entry)
+    for user_entries in entries.values():
+        merged = next((e for e in user_entries if e.conversation_id == keeper.id), user_entries[0])
+        merged.conversation = keeper
+        merged.unread_count = sum(e.unread_count for e in user_entries)
+        merged.last_message_at = max(e.last_message_at for e in user_entries)
+        read = [e for e in user_entries if e.last_read_at is not None]
+        if read:
+            latest = max(read, key=lambda e: (e.last_read_at, e.last_read_message_id or 0))
+            merged.last_read_message_id, merged.last_read_at = latest.last_read_message_id, latest.last_read_at
+        InboxEntry.objects.filter(id__in=[e.id for e in user_entries if e.id != merged.id]).delete()
+        merged.save()
+
+
+def backfill_direct_keys(apps, schema_editor):
+    """
+    Gives every direct conversation its pair key. Pairs that already have several
+    conversations (from racing start_chat clicks) are merged into the oldest one first.
+    """
+    Conversation = apps.get_model('basic', 'Conversation')
+    Message = apps.get_model('basic', 'Message')
+    InboxEntry = apps.get_model('basic', 'InboxEntry')
+    Notification = apps.get_model('basic', 'Notification')
+
+    by_pair = defaultdict(list)
+    direct = Conversation.objects.filter(task__isnull=True).prefetch_related('participants').order_by('id')
+    for conversation in direct.iterator(chunk_size=500):
+        user_ids = sorted({user.id for user in conversation.participants.all()})
+        if 1 <= len(user_ids) <= 2:
+            by_pair['%d:%d' % (user_ids[0], user_ids[-1])].append(conversation)
+
+    for key, (keeper, *duplicates) in by_pair.items():
+        if duplicates:
+            duplicate_ids = [conversation.id for conversation in duplicates]
+            Message.objects.filter(conversation_id__in=duplicate_ids).update(conversation=keeper)
+            merge_inbox_entries(InboxEntry, keeper, duplicates)
+            Notification.objects.filter(target_type='conversation', target_id__in=duplicate_ids).update(
+                target_id=keeper.id, link=f'/chat/{keeper.id}/'
+            )
+            latest = Conversation.objects.filter(id__in=[keeper.id, *duplicate_ids]).aggregate(
+                latest=Max('last_message_at')
+            )['latest']
+            Conversation.objects.filter(id__in=duplicate_ids).delete()
+            keeper.last_message_at = latest
+        keeper.direct_key = key
+        keeper.save(update_fields=['direct_key', 'last_message_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0057_conversation_direct_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_direct_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0060_message_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='firebase_uid',
+            field=models.CharField(blank=True, max_length=128, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0061_userprofile_firebase_uid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FirestoreSyncOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collection', models.CharField(max_length=100)),
+                ('document_id', models.CharField(max_length=128)),
+                ('data', models.JSONField()),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['next_attempt_at', 'id'], name='firestore_sync_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('collection', 'document_id'), name='unique_firestore_sync_document')],
+            },
+        ),
+    ]
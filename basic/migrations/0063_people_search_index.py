@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from basic.search import PEOPLE_INDEX
+
+
+def install_index(apps, schema_editor):
+    PEOPLE_INDEX.install(schema_editor.connection)
+
+
+def uninstall_index(apps, schema_editor):
+    PEOPLE_INDEX.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0062_firestoresyncoutbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_index, uninstall_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0063_people_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='friendrequest',
+            name='closeness',
+            field=models.IntegerField(default=50),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['from_user', 'to_user'], name='friendrequest_pair_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['to_user', 'is_accepted'], name='friendrequest_incoming_idx'),
+        ),
+    ]
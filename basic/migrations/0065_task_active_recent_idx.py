@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0064_friendrequest_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status__in', ('available', 'in_progress', 'disputed'))), fields=['-created_at', '-id'], name='task_active_recent_idx'),
+        ),
+    ]
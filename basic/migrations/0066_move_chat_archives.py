@@ -0,0 +1,45 @@
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations
+
+OLD_PREFIX = 'archive/'  # segments used to be stored under MEDIA_ROOT/archive/chats/
+
+
+def _move_segments(ChatArchiveSegment, from_root, to_root, rename):
+    paths = ChatArchiveSegment.objects.values_list('path', flat=True).distinct()
+    for path in list(paths):
+        new_path = rename(path)
+        if new_path is None:
+            continue
+        source, target = Path(from_root) / path, Path(to_root) / new_path
+        if source.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(source, target)
+        ChatArchiveSegment.objects.filter(path=path).update(path=new_path)
+
+
+def move_out_of_media_root(apps, schema_editor):
+    _move_segments(
+        apps.get_model('basic', 'ChatArchiveSegment'), settings.MEDIA_ROOT, settings.ARCHIVE_ROOT,
+        lambda path: path[len(OLD_PREFIX):] if path.startswith(OLD_PREFIX) else None,
+    )
+
+
+def move_back_to_media_root(apps, schema_editor):
+    _move_segments(
+        apps.get_model('basic', 'ChatArchiveSegment'), settings.ARCHIVE_ROOT, settings.MEDIA_ROOT,
+        lambda path: None if path.startswith(OLD_PREFIX) else OLD_PREFIX + path,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basic', '0065_task_active_recent_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_out_of_media_root, move_back_to_media_root),
+    ]
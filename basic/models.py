@@ -20,6 +20,10 @@ class UserProfile(models.Model):
     is_phone_verified = models.BooleanField(default=False)
     instagram_username = models.CharField(max_length=100, blank=True)
     is_instagram_verified = models.BooleanField(default=False)
+    firebase_uid = models.CharField(max_length=128, unique=True, null=True, blank=True)
+    # Denormalized count of unread notifications, maintained by basic.notifications with F()
+    # updates. Code that saves a profile must pass update_fields, or it writes back a stale count.
+    unread_notifications = models.IntegerField(default=0)
     
     # Fields for Email OTP Verification
     email_otp = models.CharField(max_length=6, blank=True, null=True)
@@ -47,6 +51,24 @@ class Task(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
     cancellation_requested = models.BooleanField(default=False)
 
+    # Statuses that still show up in the public task feed.
+    ACTIVE_STATUSES = ('available', 'in_progress', 'disputed')
+
+    class Meta:
+        indexes = [
+            # Serves the single-status feed ('available'): an equality on status, then a seek
+            # on (created_at, id) in index order.
+            models.Index(fields=['status', '-created_at', '-id'], name='task_status_created_idx'),
+            # Serves the 'recent' feed. An IN over several statuses can't be read from the index
+            # above in created_at order, so this one only holds the active tasks instead. The
+            # condition must match Task.ACTIVE_STATUSES (class attributes aren't visible here).
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(status__in=('available', 'in_progress', 'disputed')),
+                name='task_active_recent_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -89,8 +111,18 @@ class FriendRequest(models.Model):
     from_user = models.ForeignKey(User, related_name='from_user', on_delete=models.CASCADE)
     to_user = models.ForeignKey(User, related_name='to_user', on_delete=models.CASCADE)
     is_accepted = models.BooleanField(default=False)
+    # Closeness the sender picked; copied onto both Friendship rows on acceptance.
+    closeness = models.IntegerField(default=50)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Pending-request lookups between two users and the "exclude pending" subqueries.
+            models.Index(fields=['from_user', 'to_user'], name='friendrequest_pair_idx'),
+            # The incoming requests list on the friends page.
+            models.Index(fields=['to_user', 'is_accepted'], name='friendrequest_incoming_idx'),
+        ]
+
     def __str__(self):
         return f"From {self.from_user} to {self.to_user}"
 
@@ -103,6 +135,13 @@ class Conversation(models.Model):
     task = models.OneToOneField(Task, on_delete=models.CASCADE, null=True, blank=True, related_name='conversation')
     participants = models.ManyToManyField(User, related_name='conversations')
     last_message_at = models.DateTimeField(default=timezone.now)
+    # "<lower user id>:<higher user id>" for direct (task-less) conversations, so finding the
+    # conversation between two users is one unique-index probe. NULL for task chats.
+    direct_key = models.CharField(max_length=41, unique=True, null=True, blank=True)
+
+    @staticmethod
+    def direct_key_for(user_id, other_user_id):
+        return '%d:%d' % tuple(sorted((user_id, other_user_id)))
 
     def __str__(self):
         if self.task:
@@ -115,19 +154,86 @@ class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
-    is_read = models.BooleanField(default=False)
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Serves the history API, which pages backwards through a conversation by (timestamp, id).
+            models.Index(fields=['conversation', '-timestamp', '-id'], name='message_conv_recent_idx'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender.username} in {self.conversation}"
 
+class ChatArchiveSegment(models.Model):
+    """
+    A run of a conversation's messages moved out of the Message table by archive_chats.
+    The messages live in a gzip member of an append-only JSON lines file under ARCHIVE_ROOT,
+    at [offset, offset + length), so reading them back never touches the rest of the file.
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='archive_segments')
+    path = models.CharField(max_length=255)  # relative to ARCHIVE_ROOT
+    offset = models.PositiveBigIntegerField()
+    length = models.PositiveBigIntegerField()
+    message_count = models.PositiveIntegerField()
+    first_message_at = models.DateTimeField()
+    last_message_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.message_count} archived messages of conversation {self.conversation_id}"
+
+class InboxEntry(models.Model):
+    """
+    Per-participant projection of a conversation for the inbox, maintained by basic.inbox
+    so that listing conversations never has to touch participants, tasks or messages.
+
+    It also carries the participant's read watermark: the last message they have read and
+    its timestamp. Everything after the watermark (from other senders) is unread.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='inbox_entries')
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='inbox_entries')
+    other_party_name = models.CharField(max_length=255, blank=True)
+    task_title = models.CharField(max_length=200, blank=True)
+    last_message_at = models.DateTimeField(default=timezone.now)
+    unread_count = models.PositiveIntegerField(default=0)
+    last_read_message = models.ForeignKey(
+        Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    last_read_at = models.DateTimeField(null=True, blank=True)  # timestamp of last_read_message
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'conversation'], name='unique_inbox_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_message_at', '-id'], name='inbox_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"Inbox entry for {self.user.username}: {self.conversation_id}"
+
 class Notification(models.Model):
+    TARGET_CONVERSATION = 'conversation'
+    TARGET_DISPUTE = 'dispute'
+    TARGET_FRIENDS = 'friends'
+    TARGET_TASKS = 'tasks'
+    TARGET_TYPES = (
+        (TARGET_CONVERSATION, 'Conversation'),
+        (TARGET_DISPUTE, 'Dispute'),
+        (TARGET_FRIENDS, 'Friends'),
+        (TARGET_TASKS, 'My Tasks'),
+    )
+
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     message = models.CharField(max_length=255)
     link = models.URLField(blank=True, null=True)
+    # What the notification is about, so it can be marked read without matching on `link`.
+    target_type = models.CharField(max_length=20, choices=TARGET_TYPES, blank=True)
+    target_id = models.PositiveBigIntegerField(null=True, blank=True)
     is_read = models.BooleanField(default=False)
+    # Number of events folded into this row by coalescing (e.g. a burst of chat messages).
+    count = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -135,3 +241,50 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'is_read'], name='notification_unread_idx'),
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notification_recent_idx'),
+            models.Index(fields=['recipient', 'target_type', 'target_id', 'is_read'], name='notification_target_idx'),
+        ]
+
+class NotificationOutbox(models.Model):
+    """
+    A notification waiting to be fanned out by the drain_notification_outbox worker.
+    One row per event regardless of how many recipients it has.
+    """
+    recipient_ids = models.JSONField()
+    message = models.CharField(max_length=255)
+    link = models.URLField(blank=True, null=True)
+    target_type = models.CharField(max_length=20, choices=Notification.TARGET_TYPES, blank=True)
+    target_id = models.PositiveBigIntegerField(null=True, blank=True)
+    coalesce = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Outbox: {self.message} ({len(self.recipient_ids)} recipients)"
+
+class FirestoreSyncOutbox(models.Model):
+    """
+    A pending merge-write to a Firestore document, sent by the drain_firestore_sync worker.
+    There is at most one row per document: later changes are merged into the pending row
+    (bumping `version`) instead of queueing another write.
+    """
+    collection = models.CharField(max_length=100)
+    document_id = models.CharField(max_length=128)
+    data = models.JSONField()
+    version = models.PositiveIntegerField(default=1)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['collection', 'document_id'], name='unique_firestore_sync_document'),
+        ]
+        indexes = [
+            models.Index(fields=['next_attempt_at', 'id'], name='firestore_sync_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Firestore sync: {self.collection}/{self.document_id} (v{self.version})"
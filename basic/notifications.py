@@ -0,0 +1,250 @@
+from collections import Counter, defaultdict, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from . import realtime
+from .models import Notification, NotificationOutbox, UserProfile
+
+# --- Unread counters ---
+# UserProfile.unread_notifications mirrors COUNT(notifications WHERE is_read = false) so the
+# navbar badge can be read off the profile the base template loads anyway.
+
+
+def increment_unread(user_id, amount=1):
+    UserProfile.objects.filter(user_id=user_id).update(unread_notifications=F('unread_notifications') + amount)
+
+
+def decrement_unread(user_id, amount=1):
+    if amount:
+        UserProfile.objects.filter(user_id=user_id).update(
+            unread_notifications=Greatest(F('unread_notifications') - amount, Value(0))
+        )
+        # Without WebSockets (see REALTIME_WEBSOCKETS) nobody listens, so skip the count query.
+        if settings.REALTIME_WEBSOCKETS:
+            transaction.on_commit(lambda: realtime.publish_unread_count(user_id))
+
+
+def increment_unread_many(amounts):
+    """
+    Applies {user_id: amount} increments with one UPDATE per distinct amount (usually one).
+    """
+    by_amount = defaultdict(list)
+    for user_id, amount in amounts.items():
+        by_amount[amount].append(user_id)
+    for amount, user_ids in by_amount.items():
+        UserProfile.objects.filter(user_id__in=user_ids).update(unread_notifications=F('unread_notifications') + amount)
+
+
+def mark_target_read(user_id, target_type, target_id=None):
+    """
+    Marks the user's unread notifications about one target as read (an index range update on
+    recipient/target/is_read) and adjusts the unread counter. Returns the number of rows marked.
+    """
+    marked = Notification.objects.filter(
+        recipient_id=user_id, target_type=target_type, target_id=target_id, is_read=False
+    ).update(is_read=True)
+    decrement_unread(user_id, marked)
+    return marked
+
+
+def unread_count_subquery():
+    return Coalesce(
+        Subquery(
+            Notification.objects.filter(recipient_id=OuterRef('user_id'), is_read=False)
+            .order_by()
+            .values('recipient_id')
+            .annotate(count=Count('id'))
+            .values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def reconcile_unread_counts(batch_size=1000):
+    """
+    Recomputes every counter from the notifications table, one batch of profiles per
+    UPDATE, and returns how many counters had drifted.
+    """
+    fixed = 0
+    last_id = 0
+    while True:
+        ids = list(
+            UserProfile.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return fixed
+        last_id = ids[-1]
+        actual = unread_count_subquery()
+        fixed += UserProfile.objects.filter(id__in=ids).annotate(actual=actual).filter(
+            ~Q(unread_notifications=F('actual'))
+        ).update(unread_notifications=actual)
+
+
+# --- Dispatching ---
+# Views call notify()/notify_many() instead of creating Notification rows themselves. Nothing
+# is written until the surrounding transaction commits (so rolled-back work never notifies),
+# and inside a batch() everything is written together when the batch ends. With
+# NOTIFICATION_DELIVERY = 'outbox' each event becomes a single outbox row instead, which the
+# drain_notification_outbox worker fans out, so requests never pay per-recipient costs.
+#
+# Coalescing notifications (chat messages) fold into the recipient's existing unread
+# notification for the same target, bumping its count and timestamp, instead of adding a row.
+#
+# A target is a (target_type, target_id) pair such as (Notification.TARGET_CONVERSATION, 12);
+# it lets mark_target_read() clear notifications with an index range update.
+
+PendingNotification = namedtuple(
+    'PendingNotification', ['recipient_ids', 'message', 'link', 'target_type', 'target_id', 'coalesce']
+)
+
+_buffer = ContextVar('notification_buffer', default=None)
+
+
+def _user_id(user):
+    return getattr(user, 'pk', user)
+
+
+def notify(recipient, message, link=None, target=None, coalesce=False):
+    notify_many([recipient], message, link, target, coalesce)
+
+
+def notify_many(recipients, message, link=None, target=None, coalesce=False):
+    recipient_ids = list(dict.fromkeys(_user_id(recipient) for recipient in recipients))
+    if recipient_ids:
+        target_type, target_id = target or ('', None)
+        pending = PendingNotification(
+            recipient_ids, message, link, target_type, target_id, coalesce and bool(target_type)
+        )
+        transaction.on_commit(lambda: _enqueue(pending))
+
+
+def _enqueue(pending):
+    buffer = _buffer.get()
+    if buffer is None:
+        _deliver([pending])
+    else:
+        buffer.append(pending)
+
+
+@contextmanager
+def batch():
+    """
+    Buffers every notification dispatched inside the block and writes them in one go at the
+    end. Nested batches join the outermost one.
+    """
+    if _buffer.get() is not None:
+        yield
+        return
+    buffer = []
+    token = _buffer.set(buffer)
+    try:
+        yield
+    finally:
+        _buffer.reset(token)
+        if buffer:
+            _deliver(buffer)
+
+
+def _deliver(pending):
+    if getattr(settings, 'NOTIFICATION_DELIVERY', 'inline') == 'outbox':
+        NotificationOutbox.objects.bulk_create([
+            NotificationOutbox(
+                recipient_ids=p.recipient_ids, message=p.message, link=p.link,
+                target_type=p.target_type, target_id=p.target_id, coalesce=p.coalesce,
+            )
+            for p in pending
+        ])
+    else:
+        write_notifications(pending)
+
+
+def _coalesce_into_existing(pending):
+    """
+    Folds coalescing notifications into matching unread rows and returns the ones that had
+    nothing to fold into, as new unsaved Notification rows.
+    """
+    # (target, recipient) -> [event count, latest pending notification]
+    folded = {}
+    for p in pending:
+        for recipient_id in p.recipient_ids:
+            entry = folded.setdefault(((p.target_type, p.target_id), recipient_id), [0, p])
+            entry[0] += 1
+            entry[1] = p
+
+    # Recipients sharing the same target, event count and latest message are updated together.
+    groups = defaultdict(list)
+    for (target, recipient_id), (count, latest) in folded.items():
+        groups[(target, count, latest.message, latest.link)].append(recipient_id)
+
+    new_rows = []
+    now = timezone.now()
+    for ((target_type, target_id), count, message, link), recipient_ids in groups.items():
+        unread = Notification.objects.filter(
+            recipient_id__in=recipient_ids, target_type=target_type, target_id=target_id, is_read=False
+        )
+        existing = set(unread.values_list('recipient_id', flat=True))
+        if existing:
+            unread.update(count=F('count') + count, message=message, link=link, created_at=now)
+        new_rows.extend(
+            Notification(
+                recipient_id=recipient_id, message=message, link=link,
+                target_type=target_type, target_id=target_id, count=count,
+            )
+            for recipient_id in recipient_ids if recipient_id not in existing
+        )
+    return new_rows
+
+
+def write_notifications(pending):
+    """
+    Writes pending notifications with a single bulk INSERT (plus one UPDATE per coalesced
+    link) and bumps the recipients' unread counters to match. Returns the rows inserted.
+    """
+    rows = [
+        Notification(
+            recipient_id=recipient_id, message=p.message, link=p.link,
+            target_type=p.target_type, target_id=p.target_id,
+        )
+        for p in pending if not p.coalesce
+        for recipient_id in p.recipient_ids
+    ]
+    with transaction.atomic():
+        rows += _coalesce_into_existing([p for p in pending if p.coalesce])
+        Notification.objects.bulk_create(rows, batch_size=500)
+        # The counter tracks unread rows, so folded events leave it alone.
+        increment_unread_many(Counter(row.recipient_id for row in rows))
+
+    latest_by_user = {}
+    for p in pending:
+        for recipient_id in p.recipient_ids:
+            latest_by_user[recipient_id] = (p.message, p.link)
+    if settings.REALTIME_WEBSOCKETS:
+        transaction.on_commit(lambda: realtime.publish_notifications(latest_by_user))
+    return len(rows)
+
+
+def drain_outbox(batch_size=500):
+    """
+    Fans out one batch of outbox events and returns how many events were processed.
+    Safe to run from several workers at once on databases that support SKIP LOCKED.
+    """
+    with transaction.atomic():
+        events = NotificationOutbox.objects.order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            events = events.select_for_update(skip_locked=True)
+        events = list(events[:batch_size])
+        if not events:
+            return 0
+        write_notifications([
+            PendingNotification(e.recipient_ids, e.message, e.link, e.target_type, e.target_id, e.coalesce)
+            for e in events
+        ])
+        NotificationOutbox.objects.filter(id__in=[e.id for e in events]).delete()
+    return len(events)
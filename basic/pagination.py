@@ -0,0 +1,99 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        parsed = parse_datetime(value['dt'])
+        if parsed is None:
+            raise InvalidCursor("Malformed datetime in cursor.")
+        return parsed
+    return value
+
+
+def encode_cursor(values):
+    """
+    Encodes the ordering values of the last row of a page into an opaque, URL-safe token.
+    """
+    raw = json.dumps([_dump_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decodes a token produced by encode_cursor back into a list of ordering values.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Malformed cursor.")
+    if not isinstance(values, list):
+        raise InvalidCursor("Malformed cursor.")
+    return [_load_value(v) for v in values]
+
+
+def _row_value(row, name):
+    if isinstance(row, dict):
+        return row[name]
+    for attr in name.split('__'):
+        row = getattr(row, attr)
+    return row
+
+
+def _seek_filter(ordering, values):
+    """
+    Builds the "rows after this position" filter for a multi-column ordering, e.g. for
+    ('-created_at', '-id'): created_at < v0 OR (created_at = v0 AND id < v1).
+    """
+    seek = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition = Q(**{f'{name}__{lookup}': values[i]})
+        for prev_field, prev_value in zip(ordering[:i], values[:i]):
+            condition &= Q(**{prev_field.lstrip('-'): prev_value})
+        seek |= condition
+    return seek
+
+
+def keyset_page(queryset, cursor=None, page_size=20, ordering=('-created_at', '-id')):
+    """
+    Returns one page of `queryset` plus the cursor for the next page (None on the last page).
+
+    Unlike OFFSET pagination, each page is an index range scan starting right after the
+    previous page, so the cost stays the same no matter how deep the user scrolls. The last
+    entry of `ordering` must be unique (normally the primary key) to keep pages stable.
+    """
+    ordering = tuple(ordering)
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(ordering):
+            raise InvalidCursor("Cursor does not match the ordering.")
+        queryset = queryset.filter(_seek_filter(ordering, values))
+
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor([_row_value(last, f.lstrip('-')) for f in ordering])
+    return rows, next_cursor
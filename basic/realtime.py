@@ -0,0 +1,61 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    return f'user_{user_id}'
+
+
+def conversation_group(conversation_id):
+    return f'chat_{conversation_id}'
+
+
+async def _group_send_all(layer, messages):
+    for group, message in messages:
+        await layer.group_send(group, message)
+
+
+def send_to_groups(messages):
+    """
+    Sends [(group, message)] over the channel layer from synchronous code. Delivery is
+    best-effort: a missing or unreachable layer is logged and never fails the caller.
+    """
+    layer = get_channel_layer()
+    if layer is None or not messages:
+        return
+    try:
+        async_to_sync(_group_send_all)(layer, messages)
+    except Exception as e:
+        logger.error(f"Failed to push realtime events: {e}")
+
+
+def publish_notifications(latest_by_user):
+    """
+    Pushes {user_id: (message, link)} to the users' open notification streams along with
+    their current unread counts (one query for all of them).
+    """
+    counts = dict(
+        UserProfile.objects.filter(user_id__in=list(latest_by_user)).values_list('user_id', 'unread_notifications')
+    )
+    send_to_groups([
+        (user_group(user_id), {
+            'type': 'notification.event',
+            'message': message,
+            'link': link,
+            'unread_count': counts.get(user_id, 0),
+        })
+        for user_id, (message, link) in latest_by_user.items()
+    ])
+
+
+def publish_unread_count(user_id):
+    count = UserProfile.objects.filter(user_id=user_id).values_list('unread_notifications', flat=True).first() or 0
+    send_to_groups([
+        (user_group(user_id), {'type': 'notification.event', 'message': None, 'link': None, 'unread_count': count}),
+    ])
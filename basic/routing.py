@@ -1,2 +1,8 @@
-# This file is no longer used after migrating to Firestore for real-time chat.
-# The project now runs using the standard wsgi.py for HTTP requests.
+from django.urls import path
+
+from .consumers import ChatConsumer, NotificationConsumer
+
+websocket_urlpatterns = [
+    path('ws/notifications/', NotificationConsumer.as_asgi()),
+    path('ws/chat/<int:conversation_id>/', ChatConsumer.as_asgi()),
+]
@@ -0,0 +1,353 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, Case, ExpressionWrapper, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# bm25() column weights standing in for the PostgreSQL setweight() labels.
+FTS5_WEIGHTS = {'A': 10.0, 'B': 4.0, 'C': 2.0, 'D': 1.0}
+
+
+def fts5_match_expression(query):
+    """
+    Turns free-form user input into a safe FTS5 MATCH expression: every word becomes a quoted
+    prefix term, and terms are ANDed together. Returns '' when there is nothing to search for.
+    """
+    terms = TOKEN_RE.findall(query)
+    return ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+
+def no_matches(queryset):
+    """
+    An empty result that still has the `search_rank` annotation, so callers can order by it.
+    """
+    return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class FullTextIndex:
+    """
+    A full-text index over some text columns of a table.
+
+    On PostgreSQL this is a generated, weighted `tsvector` column with a GIN index, which the
+    database keeps up to date on every INSERT/UPDATE. On SQLite it is an external-content FTS5
+    table kept in sync by triggers. Any other backend falls back to icontains lookups.
+    """
+
+    def __init__(self, table, columns, language='english'):
+        self.table = table
+        self.columns = columns  # [(column, weight)], weight is a PostgreSQL label 'A'-'D'
+        self.language = language
+
+    @property
+    def column_names(self):
+        return [column for column, weight in self.columns]
+
+    @property
+    def fts_table(self):
+        return f'{self.table}_fts'
+
+    # --- Schema management (called from migrations and the rebuild_search_index command) ---
+
+    def _postgresql_sql(self):
+        vector = ' || '.join(
+            f"setweight(to_tsvector('{self.language}', coalesce({column}, '')), '{weight}')"
+            for column, weight in self.columns
+        )
+        return [
+            f"ALTER TABLE {self.table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({vector}) STORED",
+            f"CREATE INDEX IF NOT EXISTS {self.table}_search_idx ON {self.table} USING GIN (search_vector)",
+        ]
+
+    def _sqlite_sql(self):
+        columns = ', '.join(self.column_names)
+        new_values = ', '.join(f'new.{column}' for column in self.column_names)
+        old_values = ', '.join(f'old.{column}' for column in self.column_names)
+        delete_old = (
+            f"INSERT INTO {self.fts_table}({self.fts_table}, rowid, {columns}) "
+            f"VALUES ('delete', old.id, {old_values});"
+        )
+        insert_new = f"INSERT INTO {self.fts_table}(rowid, {columns}) VALUES (new.id, {new_values});"
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5("
+            f"{columns}, content='{self.table}', content_rowid='id', tokenize='porter unicode61')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ai AFTER INSERT ON {self.table} BEGIN "
+            f"{insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ad AFTER DELETE ON {self.table} BEGIN "
+            f"{delete_old} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_au AFTER UPDATE OF {columns} ON {self.table} BEGIN "
+            f"{delete_old} {insert_new} END",
+        ]
+
+    def install(self, conn):
+        """
+        Creates the index (idempotent) and indexes any rows that already exist.
+        """
+        with conn.cursor() as cursor:
+            if conn.vendor == 'postgresql':
+                for sql in self._postgresql_sql():
+                    cursor.execute(sql)
+            elif conn.vendor == 'sqlite':
+                for sql in self._sqlite_sql():
+                    cursor.execute(sql)
+                cursor.execute(f"INSERT INTO {self.fts_table}({self.fts_table}) VALUES ('rebuild')")
+
+    def uninstall(self, conn):
+        with conn.cursor() as cursor:
+            if conn.vendor == 'postgresql':
+                cursor.execute(f"DROP INDEX IF EXISTS {self.table}_search_idx")
+                cursor.execute(f"ALTER TABLE {self.table} DROP COLUMN IF EXISTS search_vector")
+            elif conn.vendor == 'sqlite':
+                for suffix in ('ai', 'ad', 'au'):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {self.fts_table}_{suffix}")
+                cursor.execute(f"DROP TABLE IF EXISTS {self.fts_table}")
+
+    # --- Querying ---
+
+    def search(self, queryset, query):
+        """
+        Filters `queryset` down to rows matching `query` and annotates a `search_rank`
+        (higher is better). The caller decides the ordering.
+        """
+        query = query.strip()
+        if connection.vendor == 'postgresql':
+            tsquery = f"websearch_to_tsquery('{self.language}', %s)"
+            return queryset.filter(
+                RawSQL(f"{self.table}.search_vector @@ {tsquery}", (query,), output_field=BooleanField())
+            ).annotate(
+                search_rank=RawSQL(f"ts_rank({self.table}.search_vector, {tsquery})", (query,), output_field=FloatField())
+            )
+
+        if connection.vendor == 'sqlite':
+            match = fts5_match_expression(query)
+            if not match:
+                return no_matches(queryset)
+            # bm25() is "lower is better", so it is negated to match the PostgreSQL convention.
+            weights = ', '.join(str(FTS5_WEIGHTS[weight]) for column, weight in self.columns)
+            return queryset.filter(
+                id__in=RawSQL(f"SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH %s", (match,))
+            ).annotate(
+                search_rank=RawSQL(
+                    f"(SELECT -bm25({self.fts_table}, {weights}) FROM {self.fts_table} "
+                    f"WHERE {self.fts_table} MATCH %s AND rowid = {self.table}.id)",
+                    (match,), output_field=FloatField(),
+                )
+            )
+
+        condition = Q()
+        for column in self.column_names:
+            condition |= Q(**{f'{column}__icontains': query})
+        return queryset.filter(condition).annotate(search_rank=RawSQL('0', (), output_field=FloatField()))
+
+
+def trigrams(query):
+    """
+    The distinct lowercase trigrams of every word of at least three characters in `query`.
+    """
+    grams = {}
+    for word in TOKEN_RE.findall(query.lower()):
+        for i in range(len(word) - 2):
+            grams[word[i:i + 3]] = None
+    return list(grams)
+
+
+class TrigramIndex:
+    """
+    A typo-tolerant index over some text columns of a table and, optionally, of a table it has
+    a foreign key to (`related` is (field name, table, columns), e.g. ('user', 'auth_user',
+    ['username'])).
+
+    On PostgreSQL every column gets a pg_trgm GIN index and rows are matched and ranked with
+    word_similarity(). On SQLite it is an FTS5 table using the trigram tokenizer, kept in sync by
+    triggers on both tables; the query is split into trigrams that are ORed together, so a typo
+    only loses the few trigrams it touches and bm25() ranks rows sharing more trigrams higher.
+    Queries too short to form a trigram (and other backends) fall back to prefix lookups.
+    """
+
+    def __init__(self, table, columns, related=None):
+        self.table = table
+        self.columns = columns
+        self.related_field, self.related_table, self.related_columns = related or (None, None, [])
+
+    @property
+    def fts_table(self):
+        return f'{self.table}_trgm'
+
+    @property
+    def _related_fk(self):
+        return f'{self.related_field}_id'
+
+    def _qualified_columns(self, alias='t', related_alias='r'):
+        return [f'{alias}.{column}' for column in self.columns] + [
+            f'{related_alias}.{column}' for column in self.related_columns
+        ]
+
+    def _lookups(self):
+        return list(self.columns) + [f'{self.related_field}__{column}' for column in self.related_columns]
+
+    def _from_sql(self):
+        if self.related_table:
+            return f"{self.table} t JOIN {self.related_table} r ON r.id = t.{self._related_fk}"
+        return f"{self.table} t"
+
+    def _source_sql(self, where=''):
+        """
+        SELECT of (id, every indexed column) from the table joined to its related table.
+        """
+        return f"SELECT t.id, {', '.join(self._qualified_columns())} FROM {self._from_sql()}{where}"
+
+    # --- Schema management (called from migrations and the rebuild_search_index command) ---
+
+    def _postgresql_sql(self):
+        sql = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
+        for table, columns in ((self.table, self.columns), (self.related_table, self.related_columns)):
+            sql.extend(
+                f"CREATE INDEX IF NOT EXISTS {table}_{column}_trgm_idx ON {table} USING GIN ({column} gin_trgm_ops)"
+                for column in columns
+            )
+        return sql
+
+    def _sqlite_sql(self):
+        all_columns = self.columns + self.related_columns
+        columns = ', '.join(all_columns)
+        insert_new = f"INSERT INTO {self.fts_table}(rowid, {columns}) {self._source_sql(' WHERE t.id = new.id')};"
+        delete_old = f"DELETE FROM {self.fts_table} WHERE rowid = old.id;"
+        sql = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5({columns}, tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ai AFTER INSERT ON {self.table} BEGIN "
+            f"{insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ad AFTER DELETE ON {self.table} BEGIN "
+            f"{delete_old} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_au AFTER UPDATE OF "
+            f"{', '.join(self.columns + [self._related_fk] if self.related_table else self.columns)} "
+            f"ON {self.table} BEGIN {delete_old} {insert_new} END",
+        ]
+        if self.related_table:
+            changes = ', '.join(f'{column} = new.{column}' for column in self.related_columns)
+            sql.append(
+                f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_rau AFTER UPDATE OF "
+                f"{', '.join(self.related_columns)} ON {self.related_table} BEGIN "
+                f"UPDATE {self.fts_table} SET {changes} WHERE rowid IN "
+                f"(SELECT id FROM {self.table} WHERE {self._related_fk} = new.id); END"
+            )
+        return sql
+
+    def install(self, conn):
+        """
+        Creates the index (idempotent) and indexes any rows that already exist.
+        """
+        with conn.cursor() as cursor:
+            if conn.vendor == 'postgresql':
+                for sql in self._postgresql_sql():
+                    cursor.execute(sql)
+            elif conn.vendor == 'sqlite':
+                for sql in self._sqlite_sql():
+                    cursor.execute(sql)
+                columns = ', '.join(self.columns + self.related_columns)
+                cursor.execute(f"DELETE FROM {self.fts_table}")
+                cursor.execute(f"INSERT INTO {self.fts_table}(rowid, {columns}) {self._source_sql()}")
+
+    def uninstall(self, conn):
+        with conn.cursor() as cursor:
+            if conn.vendor == 'postgresql':
+                for table, columns in ((self.table, self.columns), (self.related_table, self.related_columns)):
+                    for column in columns:
+                        cursor.execute(f"DROP INDEX IF EXISTS {table}_{column}_trgm_idx")
+            elif conn.vendor == 'sqlite':
+                for suffix in ('ai', 'ad', 'au', 'rau'):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {self.fts_table}_{suffix}")
+                cursor.execute(f"DROP TABLE IF EXISTS {self.fts_table}")
+
+    # --- Querying ---
+
+    def _prefix_search(self, queryset, query):
+        # Ranked by the number of columns that start with the query.
+        matches = [Q(**{f'{lookup}__istartswith': query}) for lookup in self._lookups()]
+        condition = Q()
+        for match in matches:
+            condition |= match
+        rank = sum(Case(When(match, then=Value(1.0)), default=Value(0.0)) for match in matches)
+        return queryset.filter(condition).annotate(search_rank=ExpressionWrapper(rank, output_field=FloatField()))
+
+    def search(self, queryset, query):
+        """
+        Filters `queryset` down to rows resembling `query` and annotates a `search_rank`
+        (higher is better). The caller decides the ordering.
+        """
+        query = query.strip()
+        grams = trigrams(query)
+        if not grams:
+            return self._prefix_search(queryset, query) if query else no_matches(queryset)
+
+        if connection.vendor == 'postgresql':
+            # One branch per table, so each can be answered from that table's GIN indexes.
+            matches = f"SELECT t.id FROM {self.table} t WHERE " + ' OR '.join(
+                f'%s <%% t.{column}' for column in self.columns
+            )
+            params = [query] * len(self.columns)
+            if self.related_table:
+                matches += f" UNION SELECT t.id FROM {self._from_sql()} WHERE " + ' OR '.join(
+                    f'%s <%% r.{column}' for column in self.related_columns
+                )
+                params += [query] * len(self.related_columns)
+            similarity = ', '.join(f'word_similarity(%s, {column})' for column in self._qualified_columns())
+            return queryset.filter(id__in=RawSQL(matches, params)).annotate(
+                search_rank=RawSQL(
+                    f"(SELECT GREATEST({similarity}) FROM {self._from_sql()} WHERE t.id = {self.table}.id)",
+                    [query] * len(self._qualified_columns()), output_field=FloatField(),
+                )
+            )
+
+        if connection.vendor == 'sqlite':
+            match = ' OR '.join('"%s"' % gram.replace('"', '""') for gram in grams)
+            return queryset.filter(
+                id__in=RawSQL(f"SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH %s", (match,))
+            ).annotate(
+                search_rank=RawSQL(
+                    f"(SELECT -bm25({self.fts_table}) FROM {self.fts_table} "
+                    f"WHERE {self.fts_table} MATCH %s AND rowid = {self.table}.id)",
+                    (match,), output_field=FloatField(),
+                )
+            )
+
+        return self._prefix_search(queryset, query)
+
+
+TASK_INDEX = FullTextIndex('basic_task', [('title', 'A'), ('description', 'B')])
+MESSAGE_INDEX = FullTextIndex('basic_message', [('content', 'A')])
+
+PEOPLE_INDEX = TrigramIndex(
+    'basic_userprofile', ['first_name', 'last_name', 'college', 'major', 'hostel'],
+    related=('user', 'auth_user', ['username']),
+)
+
+SEARCH_INDEXES = {
+    'task': TASK_INDEX,
+    'message': MESSAGE_INDEX,
+    'people': PEOPLE_INDEX,
+}
+
+
+def search_tasks(queryset, query):
+    """
+    Ranked full-text search over task titles and descriptions, best matches first.
+    """
+    return TASK_INDEX.search(queryset, query).order_by('-search_rank', '-created_at', '-id')
+
+
+def search_messages(queryset, query):
+    """
+    Full-text search over chat messages. Matches are ordered newest first rather than by
+    rank, since people look for "what they sent me" and this keeps the results keyset-paginable.
+    """
+    return MESSAGE_INDEX.search(queryset, query)
+
+
+def search_people(queryset, query):
+    """
+    Typo-tolerant search over user profiles (names, college, major, hostel and username),
+    best matches first.
+    """
+    return PEOPLE_INDEX.search(queryset, query).order_by('-search_rank', 'id')
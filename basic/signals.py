@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import firebase_auth, friend_graph, membership, notifications
+from .models import Conversation, Friendship, Notification, UserProfile
+
+
+@receiver([post_save, post_delete], sender=Friendship)
+def friendship_changed(sender, instance, **kwargs):
+    friend_graph.invalidate_profiles(instance.from_user_id, instance.to_user_id)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def user_profile_changed(sender, instance, update_fields=None, **kwargs):
+    # Counter and login bookkeeping saves (rewards, OTPs, firebase_uid) pass update_fields
+    # without any node field, and must not drop cached graphs.
+    if update_fields is None or not friend_graph.PROFILE_NODE_FIELDS.isdisjoint(update_fields):
+        friend_graph.invalidate_profile(instance)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    user_profile = UserProfile.objects.filter(user=instance).first()
+    if user_profile:
+        friend_graph.invalidate_profile(user_profile)
+
+
+@receiver(post_delete, sender=UserProfile)
+def user_profile_deleted(sender, instance, **kwargs):
+    if instance.firebase_uid:
+        firebase_auth.forget_uid(instance.firebase_uid)
+
+
+@receiver(post_save, sender=Notification)
+def notification_created(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        notifications.increment_unread(instance.recipient_id)
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        conversation_ids = [instance.pk]
+    elif reverse and action in ('post_add', 'post_remove'):
+        conversation_ids = list(pk_set)
+    elif reverse and action == 'pre_clear':
+        conversation_ids = list(instance.conversations.values_list('id', flat=True))
+    else:
+        return
+    # After commit, so a concurrent request cannot re-cache the old membership.
+    transaction.on_commit(lambda: membership.invalidate(*conversation_ids))
+
+
+@receiver(post_delete, sender=Conversation)
+def conversation_deleted(sender, instance, **kwargs):
+    membership.invalidate(instance.pk)
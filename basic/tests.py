@@ -1,3 +1,727 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import chat, chat_archive, consumers, directory, firestore, firestore_sync, friend_graph, membership, notifications
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .search import search_people, search_tasks
+from .models import (
+    ChatArchiveSegment, Conversation, FirestoreSyncOutbox, FriendRequest, Friendship, Message, Notification, Task, UserProfile,
+)
+
+
+class FirestoreSyncOutboxTests(TestCase):
+    def setUp(self):
+        self.db = mock.MagicMock()
+        patcher = mock.patch('basic.firestore_sync.get_client', return_value=self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fail_commits(self, fail=True):
+        self.db.batch.return_value.commit.side_effect = Exception('unavailable') if fail else None
+
+    def make_due(self):
+        FirestoreSyncOutbox.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+    def test_changes_to_one_document_collapse(self):
+        firestore_sync.enqueue('users', 'uid1', {'bio': 'a'})
+        firestore_sync.enqueue('users', 'uid1', {'major': 'Physics'})
+        entry = FirestoreSyncOutbox.objects.get()
+        self.assertEqual(entry.data, {'bio': 'a', 'major': 'Physics'})
+        self.assertEqual(entry.version, 2)
+
+    def test_successful_drain_deletes_rows(self):
+        firestore_sync.enqueue('users', 'uid1', {'bio': 'a'})
+        self.assertEqual(firestore_sync.drain(), 1)
+        self.db.batch.return_value.commit.assert_called_once()
+        self.assertFalse(FirestoreSyncOutbox.objects.exists())
+
+    def test_failed_drain_backs_off(self):
+        self.fail_commits()
+        firestore_sync.enqueue('users', 'uid1', {'bio': 'a'})
+        before = timezone.now()
+        with self.assertLogs('basic.firestore_sync', 'WARNING'):
+            self.assertEqual(firestore_sync.drain(), 1)
+        entry = FirestoreSyncOutbox.objects.get()
+        self.assertEqual(entry.attempts, 1)
+        self.assertEqual(entry.last_error, 'unavailable')
+        delay = entry.next_attempt_at - before
+        self.assertGreaterEqual(delay, timedelta(seconds=firestore_sync.BASE_BACKOFF))
+        self.assertLess(delay, timedelta(seconds=firestore_sync.BASE_BACKOFF * 2))
+        # Not due yet.
+        self.assertEqual(firestore_sync.drain(), 0)
+
+    def test_dead_lettered_row_is_retried_after_a_fresh_change(self):
+        self.fail_commits()
+        firestore_sync.enqueue('users', 'uid1', {'bio': 'a'})
+        with self.assertLogs('basic.firestore_sync', 'WARNING'):
+            for _ in range(firestore_sync.MAX_ATTEMPTS + 2):
+                self.make_due()
+                firestore_sync.drain()
+        self.assertEqual(FirestoreSyncOutbox.objects.get().attempts, firestore_sync.MAX_ATTEMPTS)
+        self.assertEqual(firestore_sync.drain(), 0)
+
+        self.fail_commits(False)
+        firestore_sync.enqueue('users', 'uid1', {'major': 'Physics'})
+        entry = FirestoreSyncOutbox.objects.get()
+        self.assertEqual((entry.attempts, entry.last_error), (0, ''))
+        self.assertEqual(firestore_sync.drain(), 1)
+        self.db.batch.return_value.set.assert_called_with(
+            self.db.collection.return_value.document.return_value, {'bio': 'a', 'major': 'Physics'}, merge=True,
+        )
+        self.assertFalse(FirestoreSyncOutbox.objects.exists())
+
+    def test_change_during_flight_is_sent_again(self):
+        firestore_sync.enqueue('users', 'uid1', {'bio': 'a'})
+
+        def change_mid_flight():
+            firestore_sync.enqueue('users', 'uid1', {'bio': 'b'})
+        self.db.batch.return_value.commit.side_effect = change_mid_flight
+
+        self.assertEqual(firestore_sync.drain(), 1)
+        entry = FirestoreSyncOutbox.objects.get()
+        self.assertEqual(entry.data, {'bio': 'b'})
+        self.assertLessEqual(entry.next_attempt_at, timezone.now())
+
+    def test_profile_form_queues_a_numeric_batch(self):
+        user = User.objects.create_user('alice')
+        UserProfile.objects.create(user=user, firebase_uid='uid1')
+        self.client.force_login(user)
+        self.client.post('/profile/', {'first_name': 'Alice', 'batch': '2027'})
+        self.assertEqual(FirestoreSyncOutbox.objects.get().data['batch'], 2027)
+
+        self.client.post('/profile/', {'first_name': 'Eve', 'batch': 'soon'})
+        profile = UserProfile.objects.get(user=user)
+        self.assertEqual((profile.first_name, profile.batch), ('Alice', 2027))
+
+
+class FirestoreClientTests(TestCase):
+    def setUp(self):
+        firestore.reset_client()
+        self.addCleanup(firestore.reset_client)
+
+    def test_failed_creation_is_retried(self):
+        client = object()
+        with mock.patch('basic.firestore._create_client', side_effect=[RuntimeError('no network'), client]) as create:
+            with self.assertLogs('basic.firestore', 'ERROR'):
+                self.assertIsNone(firestore.get_client())
+            self.assertIs(firestore.get_client(), client)
+            self.assertIs(firestore.get_client(), client)
+        self.assertEqual(create.call_count, 2)
+
+
+class ChatArchiveTests(TestCase):
+    def setUp(self):
+        archive_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_root)
+        override = override_settings(ARCHIVE_ROOT=archive_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+
+    def make_conversation(self, contents):
+        task = Task.objects.create(title='t', description='d', reward=1, posted_by=self.alice, status='completed')
+        conversation = Conversation.objects.create(task=task)
+        conversation.participants.add(self.alice, self.bob)
+        Message.objects.bulk_create(
+            Message(conversation=conversation, sender=self.alice, content=content) for content in contents
+        )
+        return conversation
+
+    def test_segment_reads_back_the_archived_messages(self):
+        conversation = self.make_conversation(['one', 'two', 'three'])
+        segment = chat_archive.archive_conversation(conversation, batch_size=2)
+        self.assertEqual(segment.message_count, 3)
+        self.assertFalse(conversation.messages.exists())
+        self.assertEqual([m['content'] for m in chat_archive.read_segment(segment)], ['one', 'two', 'three'])
+        self.assertEqual(chat_archive.read_segment(segment)[0]['sender'], 'alice')
+
+    def test_segments_sharing_a_file_stay_separate(self):
+        first = self.make_conversation(['a1', 'a2'])
+        second = self.make_conversation(['b1'])
+        path = chat_archive.segment_path()
+        segments = [chat_archive.archive_conversation(c, path=path) for c in (first, second)]
+        self.assertEqual(segments[1].offset, segments[0].offset + segments[0].length)
+        self.assertEqual([m['content'] for m in chat_archive.read_segment(segments[0])], ['a1', 'a2'])
+        self.assertEqual([m['content'] for m in chat_archive.read_segment(segments[1])], ['b1'])
+
+    def test_archive_page_walks_segments_newest_first(self):
+        conversation = self.make_conversation(['old'])
+        chat_archive.archive_conversation(conversation)
+        Message.objects.create(conversation=conversation, sender=self.bob, content='new')
+        chat_archive.archive_conversation(conversation)
+        self.assertEqual(ChatArchiveSegment.objects.filter(conversation=conversation).count(), 2)
+
+        messages, cursor = chat_archive.archive_page(conversation.id)
+        self.assertEqual([m['content'] for m in messages], ['new'])
+        messages, cursor = chat_archive.archive_page(conversation.id, cursor=cursor)
+        self.assertEqual([m['content'] for m in messages], ['old'])
+        self.assertIsNone(cursor)
+
+    def test_missing_segment_file_reads_as_empty(self):
+        conversation = self.make_conversation(['lost'])
+        segment = chat_archive.archive_conversation(conversation)
+        (Path(chat_archive.settings.ARCHIVE_ROOT) / segment.path).unlink()
+
+        with self.assertLogs('basic.chat_archive', level='ERROR'):
+            self.assertEqual(chat_archive.read_segment(segment), [])
+        self.client.force_login(self.alice)
+        with self.assertLogs('basic.chat_archive', level='ERROR'):
+            response = self.client.get(f'/chat/{conversation.id}/archive/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_concurrent_appends_do_not_interleave(self):
+        full_path = Path(chat_archive.settings.ARCHIVE_ROOT) / chat_archive.segment_path()
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        payloads = {'first': b'1' * 1000, 'second': b'2' * 1000}
+        first_half_written = threading.Event()
+        second_copying = threading.Event()
+        ranges = []
+
+        def copy(src, dst):
+            # The first run pauses halfway through its append until the second run starts
+            # copying (which the lock should prevent, so it gives up after a short wait).
+            if threading.current_thread().name == 'first':
+                dst.write(src.read(500))
+                dst.flush()
+                first_half_written.set()
+                second_copying.wait(timeout=0.5)
+            else:
+                second_copying.set()
+            dst.write(src.read())
+
+        def append(name):
+            with tempfile.TemporaryFile() as staging:
+                staging.write(payloads[name])
+                staging.seek(0)
+                ranges.append(chat_archive._append_member(full_path, staging))
+
+        first = threading.Thread(target=append, args=('first',), name='first')
+        second = threading.Thread(target=append, args=('second',), name='second')
+        with mock.patch('basic.chat_archive.shutil.copyfileobj', copy):
+            first.start()
+            first_half_written.wait()
+            second.start()
+            first.join()
+            second.join()
+
+        data = full_path.read_bytes()
+        self.assertEqual(sorted(data[offset:offset + length] for offset, length in ranges), sorted(payloads.values()))
+
+
+class NotificationTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        for user in (self.alice, self.bob):
+            UserProfile.objects.create(user=user)
+
+    def unread(self, user):
+        return UserProfile.objects.get(user=user).unread_notifications
+
+    def test_notify_writes_on_commit_and_counts_unread(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.notify_many([self.alice, self.bob, self.alice], 'Hello')
+            self.assertFalse(Notification.objects.exists())
+        self.assertEqual(Notification.objects.filter(message='Hello').count(), 2)
+        self.assertEqual((self.unread(self.alice), self.unread(self.bob)), (1, 1))
+
+    def test_coalescing_folds_into_the_unread_notification(self):
+        target = (Notification.TARGET_CONVERSATION, 7)
+        for text in ('first', 'second'):
+            with self.captureOnCommitCallbacks(execute=True):
+                notifications.notify(self.alice, text, target=target, coalesce=True)
+        notification = Notification.objects.get(recipient=self.alice)
+        self.assertEqual((notification.count, notification.message), (2, 'second'))
+        self.assertEqual(self.unread(self.alice), 1)
+
+        # Once read, the next event starts a new notification.
+        self.assertEqual(notifications.mark_target_read(self.alice.id, *target), 1)
+        self.assertEqual(self.unread(self.alice), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.notify(self.alice, 'third', target=target, coalesce=True)
+        self.assertEqual(Notification.objects.filter(recipient=self.alice).count(), 2)
+        self.assertEqual(self.unread(self.alice), 1)
+
+    def test_batch_coalesces_events_in_one_write(self):
+        target = (Notification.TARGET_CONVERSATION, 7)
+        with self.captureOnCommitCallbacks(execute=True), notifications.batch():
+            for text in ('one', 'two', 'three'):
+                notifications.notify(self.bob, text, target=target, coalesce=True)
+        notification = Notification.objects.get(recipient=self.bob)
+        self.assertEqual((notification.count, notification.message), (3, 'three'))
+        self.assertEqual(self.unread(self.bob), 1)
+
+    def test_counter_never_goes_negative(self):
+        notifications.decrement_unread(self.alice.id, 5)
+        self.assertEqual(self.unread(self.alice), 0)
+
+    @mock.patch('basic.notifications.realtime')
+    def test_counts_are_only_pushed_with_websockets(self, realtime):
+        for enabled in (False, True):
+            with override_settings(REALTIME_WEBSOCKETS=enabled), self.captureOnCommitCallbacks(execute=True):
+                notifications.notify(self.alice, 'Hello')
+                notifications.decrement_unread(self.alice.id)
+            self.assertEqual(realtime.publish_notifications.called, enabled)
+            self.assertEqual(realtime.publish_unread_count.called, enabled)
+
+    def test_reconcile_fixes_drifted_counters(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.notify_many([self.alice, self.bob], 'Hello')
+        UserProfile.objects.filter(user=self.alice).update(unread_notifications=9)
+        self.assertEqual(notifications.reconcile_unread_counts(batch_size=1), 1)
+        self.assertEqual((self.unread(self.alice), self.unread(self.bob)), (1, 1))
+
+    def test_profile_saves_leave_the_counter_alone(self):
+        profile = UserProfile.objects.get(user=self.alice)
+        notifications.increment_unread(self.alice.id, 3)
+        self.client.force_login(self.alice)
+        self.client.post('/profile/', {'first_name': 'Alice', 'batch': 2027})
+        profile.rewards += 10
+        profile.save(update_fields=['rewards'])
+        self.assertEqual(UserProfile.objects.get(user=self.alice).first_name, 'Alice')
+        self.assertEqual(self.unread(self.alice), 3)
+
+    def test_prune_archives_whole_rows_outside_media_root(self):
+        archive_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_root)
+        notification = Notification.objects.create(
+            recipient=self.alice, message='Old', link='https://example.com/chat/7/',
+            target_type=Notification.TARGET_CONVERSATION, target_id=7, is_read=True,
+        )
+        Notification.objects.filter(id=notification.id).update(created_at=timezone.now() - timedelta(days=400))
+
+        with override_settings(ARCHIVE_ROOT=archive_root):
+            call_command('prune_notifications', '--archive', '--days=30', stdout=mock.Mock())
+        self.assertFalse(Notification.objects.exists())
+        archive, = (Path(archive_root) / 'notifications').iterdir()
+        with gzip.open(archive, 'rt', encoding='utf-8') as archive_file:
+            row, = [json.loads(line) for line in archive_file]
+        self.assertEqual(row['id'], notification.id)
+        self.assertEqual((row['is_read'], row['target_type'], row['target_id']), (True, 'conversation', 7))
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        now = timezone.now()
+        # Pairs of tasks share a created_at, so pages have to break ties on id.
+        for i in range(7):
+            Task.objects.create(title=f'task {i}', description='d', reward=1, posted_by=self.alice)
+        for i, task in enumerate(Task.objects.order_by('id')):
+            Task.objects.filter(id=task.id).update(created_at=now - timedelta(minutes=i // 2))
+
+    def test_cursor_round_trips_datetimes(self):
+        values = [timezone.now(), 42]
+        self.assertEqual(decode_cursor(encode_cursor(values)), values)
+
+    def test_pages_cover_every_row_once_in_order(self):
+        expected = list(Task.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(Task.objects.all(), cursor=cursor, page_size=3)
+            seen.extend(row.id for row in rows)
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_last_page_has_no_cursor(self):
+        rows, cursor = keyset_page(Task.objects.all(), page_size=7)
+        self.assertEqual((len(rows), cursor), (7, None))
+
+    def test_values_querysets_and_custom_orderings(self):
+        rows, cursor = keyset_page(Task.objects.values('id', 'title'), page_size=4, ordering=('id',))
+        rest, _ = keyset_page(Task.objects.values('id', 'title'), cursor=cursor, page_size=4, ordering=('id',))
+        self.assertEqual([row['id'] for row in rows + rest], list(Task.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_bad_cursors_are_rejected(self):
+        for cursor in ('not base64!', encode_cursor({'a': 1}), encode_cursor([1])):
+            with self.assertRaises(InvalidCursor):
+                keyset_page(Task.objects.all(), cursor=cursor)
+
+    def test_task_feed_endpoint(self):
+        response = self.client.get('/tasks/feed/', {'section': 'recent'})
+        self.assertEqual(len(response.json()['results']), 7)
+        self.assertEqual(self.client.get('/tasks/feed/', {'cursor': 'bogus'}).status_code, 400)
+
+
+class FriendGraphTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.profiles = [UserProfile.objects.create(user=User.objects.create_user(f'user{i}')) for i in range(6)]
+        self.me = self.profiles[0]
+
+    def befriend(self, profile, closeness):
+        Friendship.objects.create(from_user=self.me, to_user=profile, closeness=closeness)
+
+    def test_friends_come_first_closest_first(self):
+        self.befriend(self.profiles[1], 10)
+        self.befriend(self.profiles[2], 90)
+        nodes = friend_graph.build_user_nodes(self.me, max_nodes=4)
+        self.assertEqual([n['username'] for n in nodes[:2]], ['user2', 'user1'])
+        self.assertEqual([n['closeness'] for n in nodes], [90, 10, 0, 0])
+        self.assertNotIn('user0', [n['username'] for n in nodes])
+
+    def test_every_friend_is_kept_beyond_max_nodes(self):
+        for i, profile in enumerate(self.profiles[1:]):
+            self.befriend(profile, i)
+        with self.assertNumQueries(1):
+            nodes = friend_graph.build_user_nodes(self.me, max_nodes=2)
+        self.assertEqual(len(nodes), 5)
+
+    def test_cached_nodes_are_invalidated_by_friendship_changes(self):
+        self.assertTrue(all(n['closeness'] == 0 for n in friend_graph.get_user_nodes(self.me)))
+        self.befriend(self.profiles[1], 70)
+        self.assertEqual(friend_graph.get_user_nodes(self.me)[0]['closeness'], 70)
+
+    def test_bookkeeping_saves_keep_cached_nodes(self):
+        friend_graph.get_user_nodes(self.me)
+        self.profiles[1].rewards += 10
+        self.profiles[1].save(update_fields=['rewards'])
+        self.profiles[1].user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            friend_graph.get_user_nodes(self.me)
+
+    @mock.patch.object(friend_graph, 'MAX_NODES', 2)
+    def test_node_changes_invalidate_the_profile_and_its_friends(self):
+        friend = self.profiles[5]
+        self.befriend(friend, 70)
+        friend_graph.get_user_nodes(self.me)
+        friend_graph.get_user_nodes(self.profiles[3])
+
+        friend.phone_number = '5550100'
+        friend.save(update_fields=['phone_number'])
+        friend.user.username = 'renamed'
+        friend.user.save(update_fields=['username'])
+        node = friend_graph.get_user_nodes(self.me)[0]
+        self.assertEqual((node['username'], node['phone']), ('renamed', '5550100'))
+        # Too late in id order to be anyone's filler node, so other snapshots are untouched.
+        with self.assertNumQueries(0):
+            friend_graph.get_user_nodes(self.profiles[3])
+
+    def test_early_profiles_invalidate_every_snapshot(self):
+        friend_graph.get_user_nodes(self.me)
+        self.profiles[1].instagram_username = 'user1.ig'
+        self.profiles[1].save()
+        filler = next(n for n in friend_graph.get_user_nodes(self.me) if n['username'] == 'user1')
+        self.assertEqual(filler['instagram'], 'user1.ig')
+
+
+class ChatHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.eve = User.objects.create_user('eve')
+        for user in (self.alice, self.bob, self.eve):
+            UserProfile.objects.create(user=user)
+        self.conversation = chat.get_or_create_direct(self.alice, self.bob)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.messages = chat.persist_messages(self.conversation, self.alice, [f'm{i}' for i in range(5)])
+        self.url = f'/chat/{self.conversation.id}/messages/'
+
+    def test_direct_conversation_is_reused(self):
+        self.assertEqual(chat.get_or_create_direct(self.bob, self.alice), self.conversation)
+
+    def test_history_pages_newest_first(self):
+        first, cursor = chat.history_page(self.conversation, page_size=3)
+        second, cursor = chat.history_page(self.conversation, cursor=cursor, page_size=3)
+        self.assertEqual([m.content for m in first + second], ['m4', 'm3', 'm2', 'm1', 'm0'])
+        self.assertIsNone(cursor)
+
+        self.client.force_login(self.bob)
+        data = self.client.get(self.url).json()
+        self.assertEqual([m['content'] for m in data['results']], ['m4', 'm3', 'm2', 'm1', 'm0'])
+        self.assertEqual(self.client.get(self.url, {'cursor': 'bogus'}).status_code, 400)
+
+    def test_polling_returns_newer_messages_and_receipts(self):
+        self.client.force_login(self.bob)
+        self.client.get(f'/chat/{self.conversation.id}/')  # opening the chat marks it read
+        self.client.force_login(self.alice)
+        data = self.client.get(self.url, {'after': self.messages[2].id}).json()
+        self.assertEqual([m['content'] for m in data['results']], ['m3', 'm4'])
+        self.assertEqual(data['read_receipts'], {str(self.bob.id): self.messages[-1].id})
+        self.assertEqual(self.client.get(self.url, {'after': self.messages[-1].id}).json()['results'], [])
+        self.assertEqual(self.client.get(self.url, {'after': 'x'}).status_code, 400)
+
+    def test_polling_client_marks_read_over_http(self):
+        read_url = f'/chat/{self.conversation.id}/read/'
+        self.client.force_login(self.bob)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(read_url, {'message_id': self.messages[2].id})
+        self.assertEqual(response.status_code, 200)
+        self.client.force_login(self.alice)
+        data = self.client.get(self.url, {'after': self.messages[-1].id}).json()
+        self.assertEqual(data['read_receipts'], {str(self.bob.id): self.messages[2].id})
+
+        self.client.force_login(self.bob)
+        self.assertEqual(self.client.post(read_url, {'message_id': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(read_url).status_code, 400)
+        self.client.force_login(self.eve)
+        self.assertEqual(self.client.post(read_url, {'message_id': self.messages[2].id}).status_code, 403)
+
+    def test_outsiders_are_refused(self):
+        self.client.force_login(self.eve)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get(self.url, {'after': 0}).status_code, 403)
+
+    def test_message_search_is_scoped_to_own_chats(self):
+        private = chat.get_or_create_direct(self.bob, self.eve)
+        with self.captureOnCommitCallbacks(execute=True):
+            chat.persist_messages(self.conversation, self.bob, ['meet at the library'])
+            chat.persist_messages(private, self.eve, ['library secret'])
+
+        results, cursor = chat.search_page(self.alice, 'library')
+        self.assertEqual([m.content for m in results], ['meet at the library'])
+        self.assertIsNone(cursor)
+        results, _ = chat.search_page(self.bob, 'library')
+        self.assertEqual([m.content for m in results], ['library secret', 'meet at the library'])
+
+        self.client.force_login(self.eve)
+        response = self.client.get('/chat/search/', {'q': 'library'})
+        self.assertContains(response, 'library secret')
+        self.assertNotContains(response, 'meet at the library')
+
+    def test_failed_timed_flush_is_reported_to_the_sender(self):
+        consumer = consumers.ChatConsumer()
+        consumer.conversation_id = self.conversation.id
+        consumer.send_json = mock.AsyncMock()
+        with mock.patch.object(consumer, 'flush', side_effect=Exception('database is down')), \
+                self.assertLogs('basic.consumers', level='ERROR'):
+            asyncio.run(consumer._timed_flush())
+        consumer.send_json.assert_awaited_once_with({'type': 'error', 'error': 'Your message could not be sent.'})
+
+
+class TaskSearchTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+
+    def task(self, title, description='', **kwargs):
+        return Task.objects.create(title=title, description=description, reward=1, posted_by=self.alice, **kwargs)
+
+    def titles(self, query):
+        return [task.title for task in search_tasks(Task.objects.all(), query)]
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.task('Walk my dog', 'Around the park')
+        self.task('Groceries', 'Then walk back home')
+        self.task('Laundry', 'Nothing relevant')
+        self.assertEqual(self.titles('walk'), ['Walk my dog', 'Groceries'])
+
+    def test_prefix_and_stemmed_matches(self):
+        self.task('Printing notes', 'Twenty pages')
+        self.assertEqual(self.titles('print'), ['Printing notes'])
+        self.assertEqual(self.titles('page'), ['Printing notes'])
+
+    def test_index_follows_edits_and_deletes(self):
+        task = self.task('Walk my dog')
+        task.title = 'Feed my cat'
+        task.save()
+        self.assertEqual(self.titles('walk'), [])
+        self.assertEqual(self.titles('cat'), ['Feed my cat'])
+        task.delete()
+        self.assertEqual(self.titles('cat'), [])
+
+    def test_empty_and_punctuation_only_queries(self):
+        self.task('Walk my dog')
+        for query in ('', '   ', '!', '"', '*)('):
+            self.assertEqual(self.titles(query), [])
+        for query in ('!', '"'):
+            self.assertEqual(self.client.get('/', {'q': query}).status_code, 200)
+            response = self.client.get('/tasks/feed/', {'q': query})
+            self.assertEqual((response.status_code, response.json()['results']), (200, []))
+
+
+class PeopleSearchTests(TestCase):
+    def setUp(self):
+        self.profiles = {}
+        for username, first_name, college in (
+            ('priya', 'Priyanka', 'IIT Delhi'),
+            ('rahul', 'Rahul', 'NIT Trichy'),
+            ('zoe', 'Zoe', 'IIT Bombay'),
+        ):
+            user = User.objects.create_user(username)
+            self.profiles[username] = UserProfile.objects.create(user=user, first_name=first_name, college=college)
+
+    def usernames(self, query):
+        return [profile.user.username for profile in search_people(UserProfile.objects.select_related('user'), query)]
+
+    def test_typos_still_match_best_first(self):
+        self.assertEqual(self.usernames('priyanak'), ['priya'])
+        self.assertEqual(self.usernames('iit delhi'), ['priya', 'zoe'])
+
+    def test_index_follows_profile_and_username_changes(self):
+        profile = self.profiles['rahul']
+        profile.major = 'Metallurgy'
+        profile.save()
+        self.assertEqual(self.usernames('metallurgy'), ['rahul'])
+
+        # auth_user changes reach the index through its own trigger.
+        profile.user.username = 'quixotic'
+        profile.user.save()
+        self.assertEqual(self.usernames('quixotic'), ['quixotic'])
+        self.assertEqual(self.usernames('rahul'), ['quixotic'])  # still matches the first name
+
+        profile.delete()
+        self.assertEqual(self.usernames('metallurgy'), [])
+
+    def test_short_queries_match_prefixes(self):
+        self.assertEqual(self.usernames('zo'), ['zoe'])
+        self.assertEqual(self.usernames('r'), ['rahul'])
+        self.assertEqual(self.usernames('oe'), [])
+        self.assertEqual(self.usernames(' '), [])
+
+    def test_view_handles_punctuation(self):
+        self.client.force_login(self.profiles['zoe'].user)
+        for query in ('!', '"', 'zo'):
+            response = self.client.get('/users/search/', {'q': query, 'format': 'json'})
+            self.assertEqual(response.status_code, 200)
+
+
+class DirectoryTests(TestCase):
+    def setUp(self):
+        self.profiles = {
+            username: UserProfile.objects.create(user=User.objects.create_user(username), college='IIT')
+            for username in ('me', 'friend', 'asked', 'asker', 'stranger1', 'stranger2')
+        }
+        self.me = self.profiles['me']
+        self.me.friends.add(self.profiles['friend'])
+        FriendRequest.objects.create(from_user=self.me.user, to_user=self.profiles['asked'].user)
+        FriendRequest.objects.create(from_user=self.profiles['asker'].user, to_user=self.me.user)
+
+    def test_candidates_exclude_self_friends_and_pending_requests(self):
+        usernames = directory.candidates(self.me.user).values_list('user__username', flat=True)
+        self.assertEqual(sorted(usernames), ['stranger1', 'stranger2'])
+
+    def test_directory_pages_through_candidates(self):
+        self.client.force_login(self.me.user)
+        first = self.client.get('/users/directory/', {'college': 'IIT'}).json()
+        self.assertEqual([e['username'] for e in first['results']], ['stranger1', 'stranger2'])
+        self.assertIsNone(first['next_cursor'])
+
+        rows, cursor = directory.directory_page(self.me.user, page_size=1)
+        rows, cursor = directory.directory_page(self.me.user, cursor=cursor, page_size=1)
+        self.assertEqual([row['user__username'] for row in rows], ['stranger2'])
+        self.assertEqual(self.client.get('/users/directory/', {'batch': 'x'}).status_code, 400)
+
+    def test_friends_page_suggests_only_candidates(self):
+        self.client.force_login(self.me.user)
+        with mock.patch('basic.views.friends.SUGGESTIONS_PAGE_SIZE', 1):
+            response = self.client.get('/friends/')
+            self.assertEqual([p.user.username for p in response.context['other_users']], ['stranger1'])
+            response = self.client.get('/friends/', {'cursor': response.context['suggestions_cursor']})
+        self.assertEqual([p.user.username for p in response.context['other_users']], ['stranger2'])
+        self.assertIsNone(response.context['suggestions_cursor'])
+
+
+class MembershipCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.conversation = Conversation.objects.create()
+        self.other = Conversation.objects.create()
+
+    def participants(self, conversation):
+        return membership.participant_ids(conversation.id)
+
+    def test_forward_changes_invalidate_after_commit(self):
+        self.assertEqual(self.participants(self.conversation), frozenset())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conversation.participants.add(self.alice, self.bob)
+            self.assertEqual(self.participants(self.conversation), frozenset())  # not committed yet
+        self.assertEqual(self.participants(self.conversation), {self.alice.id, self.bob.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conversation.participants.remove(self.bob)
+        self.assertEqual(self.participants(self.conversation), {self.alice.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conversation.participants.clear()
+        self.assertEqual(self.participants(self.conversation), frozenset())
+
+    def test_reverse_changes_invalidate_every_affected_conversation(self):
+        for conversation in (self.conversation, self.other):
+            self.assertFalse(membership.is_participant(self.alice, conversation.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.conversations.add(self.conversation, self.other)
+        self.assertTrue(membership.is_participant(self.alice, self.other.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.conversations.remove(self.other)
+        self.assertFalse(membership.is_participant(self.alice, self.other.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.conversations.clear()
+        self.assertFalse(membership.is_participant(self.alice, self.conversation.id))
+
+        conversation_id = self.conversation.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conversation.participants.add(self.bob)
+        self.assertEqual(membership.participant_ids(conversation_id), {self.bob.id})
+        # Deleting clears the rows without an m2m signal, so the delete itself invalidates.
+        self.conversation.delete()
+        self.assertEqual(membership.participant_ids(conversation_id), frozenset())
+
+
+class DirectKeyBackfillMigrationTests(TransactionTestCase):
+    migrate_from = [('basic', '0057_conversation_direct_key')]
+    migrate_to = [('basic', '0058_backfill_direct_keys')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicate_direct_chats_are_merged_into_the_oldest(self):
+        apps = self.migrate(self.migrate_from)
+        User = apps.get_model('auth', 'User')
+        Conversation = apps.get_model('basic', 'Conversation')
+        Message = apps.get_model('basic', 'Message')
+        InboxEntry = apps.get_model('basic', 'InboxEntry')
+        Notification = apps.get_model('basic', 'Notification')
+
+        alice = User.objects.create(username='alice')
+        bob = User.objects.create(username='bob')
+        keeper, duplicate = Conversation.objects.create(), Conversation.objects.create()
+        for conversation, text in ((keeper, 'first'), (duplicate, 'second')):
+            conversation.participants.add(alice, bob)
+            Message.objects.create(conversation=conversation, sender=alice, content=text)
+            InboxEntry.objects.create(user=bob, conversation=conversation, unread_count=1)
+        Notification.objects.create(
+            recipient=bob, message='New message', link=f'/chat/{duplicate.id}/',
+            target_type='conversation', target_id=duplicate.id,
+        )
+
+        apps = self.migrate(self.migrate_to)
+        Conversation = apps.get_model('basic', 'Conversation')
+        conversation = Conversation.objects.get()
+        self.assertEqual(conversation.id, keeper.id)
+        self.assertEqual(conversation.direct_key, f'{alice.id}:{bob.id}')
+        self.assertEqual(
+            sorted(apps.get_model('basic', 'Message').objects.filter(conversation=conversation).values_list('content', flat=True)),
+            ['first', 'second'],
+        )
+        entry = apps.get_model('basic', 'InboxEntry').objects.get(user_id=bob.id)
+        self.assertEqual((entry.conversation_id, entry.unread_count), (keeper.id, 2))
+        notification = apps.get_model('basic', 'Notification').objects.get()
+        self.assertEqual((notification.target_id, notification.link), (keeper.id, f'/chat/{keeper.id}/'))
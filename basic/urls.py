@@ -1,5 +1,5 @@
 from django.urls import path
-from .views.home import home
+from .views.home import home, task_feed
 from .views.authentication import login_page, logout_view, register_view, verify_otp_view
 from .views.profile import profile_view, user_profile_view, update_closeness
 from .views.tasks import (
@@ -7,13 +7,14 @@ from .views.tasks import (
     request_cancellation, accept_cancellation, abandon_task
 )
 from .views.dispute import dispute_detail_view, withdraw_dispute, raise_dispute
-from .views.chat import start_chat, chat_view, send_message
-from .views.friends import friends_view, send_friend_request, accept_friend_request, decline_friend_request, user_list
+from .views.chat import start_chat, chat_view, send_message, inbox_view, message_history, message_archive, message_search, mark_chat_read
+from .views.friends import friends_view, send_friend_request, accept_friend_request, decline_friend_request, user_list, user_directory, people_search
 from .views.notifications import notifications_view
 from .views.rewards import rewards_view
 
 urlpatterns = [
     path('', home, name='home'),
+    path('tasks/feed/', task_feed, name='task_feed'),
     path('login/', login_page, name='login_page'),
     path('register/', register_view, name='register'),
     path('verify-otp/', verify_otp_view, name='verify_otp'), # Add this line
@@ -39,11 +40,18 @@ urlpatterns = [
 
     # Chat URLs
     path('chat/start/<int:user_id>/', start_chat, name='start_chat'),
+    path('chat/search/', message_search, name='message_search'),
     path('chat/<int:conversation_id>/', chat_view, name='chat_view'),
     path('chat/send/<int:conversation_id>/', send_message, name='send_message'),
+    path('chat/<int:conversation_id>/messages/', message_history, name='message_history'),
+    path('chat/<int:conversation_id>/archive/', message_archive, name='message_archive'),
+    path('chat/<int:conversation_id>/read/', mark_chat_read, name='mark_chat_read'),
+    path('inbox/', inbox_view, name='inbox'),
 
     # User & Friend URLs
     path('users/', user_list, name='user_list'),
+    path('users/directory/', user_directory, name='user_directory'),
+    path('users/search/', people_search, name='people_search'),
     path('friends/', friends_view, name='friends'),
     path('friend/send/<int:user_id>/', send_friend_request, name='send_friend_request'),
     path('friend/accept/<int:request_id>/', accept_friend_request, name='accept_friend_request'),
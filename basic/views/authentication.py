@@ -23,7 +23,7 @@ def register_view(request):
             otp = str(random.randint(100000, 999999))
             profile.email_otp = otp
             profile.email_otp_created_at = timezone.now()
-            profile.save()
+            profile.save(update_fields=['email_otp', 'email_otp_created_at'])
 
             # Send OTP email
             try:
@@ -84,7 +84,7 @@ def verify_otp_view(request):
             # Clear OTP fields
             profile.email_otp = None
             profile.email_otp_created_at = None
-            profile.save()
+            profile.save(update_fields=['email_otp', 'email_otp_created_at'])
 
             login(request, user)
             messages.success(request, "Email verified successfully. You are now logged in.")
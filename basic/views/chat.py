@@ -1,10 +1,15 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from ..models import Conversation, Message, Notification
+from ..models import Conversation
+from .. import inbox
+from ..chat_archive import archive_page
+from ..membership import is_participant
+from ..chat import MAX_MESSAGE_LENGTH, get_or_create_direct, history_page, mark_read, messages_after, persist_messages, search_page, serialize_message
+from ..pagination import InvalidCursor
 from django.contrib.auth.models import User
 from django.http import HttpResponseForbidden, JsonResponse
 from django.urls import reverse
-from django.utils import timezone
+from django.utils.http import urlencode
 from django.contrib import messages # Import messages
 import logging
 
@@ -23,77 +28,140 @@ def chat_view(request, conversation_id):
         messages.error(request, "Chat not found.")
         return redirect('home')
 
-    if request.user not in conversation.participants.all():
+    if not is_participant(request.user, conversation.id):
         logger.warning("Step 2: User is not a participant. Redirecting to home.")
         messages.error(request, "You are not authorized to view this chat.")
         return redirect('home') # Redirect to home page
     logger.info("Step 2: User is a valid participant.")
 
     try:
-        # This is for the Django-based message system, which we are bypassing for Firestore.
-        # We will pass an empty list to the template.
-        messages_list = [] # Renamed to avoid conflict with django.contrib.messages
-        logger.info("Step 3: Bypassing Django message fetching for Firestore.")
+        # Only the latest page; older pages come from message_history as the user scrolls up,
+        # and new messages arrive over the chat WebSocket.
+        recent, history_cursor = history_page(conversation)
+        messages_list = [serialize_message(message) for message in reversed(recent)] # Renamed to avoid conflict with django.contrib.messages
+        logger.info(f"Step 3: Loaded {len(messages_list)} messages.")
     except Exception as e:
+        messages_list, history_cursor = [], None
         logger.error(f"ERROR at Step 3 (Message Handling): {e}")
 
     try:
-        # Mark related notifications as read
-        notification_link = reverse('chat_view', args=[conversation_id])
-        updated_count = Notification.objects.filter(
-            recipient=request.user, 
-            link=notification_link, 
-            is_read=False
-        ).update(is_read=True)
-        logger.info(f"Step 4: Marked {updated_count} related notifications as read.")
+        # Moves the read watermark to the latest message and clears related notifications
+        watermark = mark_read(request.user, conversation)
+        logger.info(f"Step 4: Read watermark is now {watermark}.")
     except Exception as e:
-        logger.error(f"ERROR at Step 4 (Marking notifications): {e}")
+        logger.error(f"ERROR at Step 4 (Marking read): {e}")
 
-    context = {'conversation': conversation, 'messages': messages_list}
+    context = {
+        'conversation': conversation,
+        'chat_messages': messages_list,
+        'history_cursor': history_cursor,
+        'read_receipts': inbox.read_watermarks(conversation, exclude_user=request.user),
+        'has_archive': conversation.archive_segments.exists(),
+    }
     
     logger.info(f"--- CHAT_VIEW END: Successfully rendering template. ---")
     return render(request, 'chat.html', context)
 
 
+@login_required(login_url='/login/')
+def message_history(request, conversation_id):
+    """
+    Older messages of a conversation, one page at a time, newest first.
+    With ?after=<message id> it instead returns the messages newer than that one, oldest
+    first, plus the read receipts: the polling fallback for when the chat socket is down.
+    """
+    if not is_participant(request.user, conversation_id):
+        return HttpResponseForbidden("You are not authorized to view this chat.")
+    conversation = Conversation(id=conversation_id)
+    if 'after' in request.GET:
+        try:
+            after = int(request.GET['after'])
+        except ValueError:
+            return JsonResponse({'error': 'Invalid message id.'}, status=400)
+        return JsonResponse({
+            'results': [serialize_message(message) for message in messages_after(conversation, after)],
+            'read_receipts': inbox.read_watermarks(conversation, exclude_user=request.user),
+        })
+    try:
+        page, next_cursor = history_page(conversation, cursor=request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+    return JsonResponse({
+        'results': [serialize_message(message) for message in page],
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required(login_url='/login/')
+def message_archive(request, conversation_id):
+    """
+    Archived history of a conversation (see the archive_chats command), one archive segment
+    per page, newest first. The chat page switches to this once message_history runs out.
+    """
+    if not is_participant(request.user, conversation_id):
+        return HttpResponseForbidden("You are not authorized to view this chat.")
+    try:
+        page, next_cursor = archive_page(conversation_id, cursor=request.GET.get('cursor') or None)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+    return JsonResponse({'results': page, 'next_cursor': next_cursor})
+
+
+@login_required(login_url='/login/')
+def mark_chat_read(request, conversation_id):
+    """
+    Moves the user's read watermark up to the POSTed message_id: how the chat page reports
+    what it has seen while polling, when the chat socket is down.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error'}, status=400)
+    if not is_participant(request.user, conversation_id):
+        return HttpResponseForbidden("You are not authorized to view this chat.")
+    try:
+        message_id = int(request.POST['message_id'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Invalid message id.'}, status=400)
+    mark_read(request.user, Conversation(id=conversation_id), message_id)
+    return JsonResponse({'status': 'success'})
+
+
 @login_required(login_url='/login/')
 def send_message(request, conversation_id):
     if request.method == 'POST':
-        conversation = get_object_or_404(Conversation, id=conversation_id)
-        if request.user not in conversation.participants.all():
+        if not is_participant(request.user, conversation_id):
             return HttpResponseForbidden("You are not authorized to send messages in this chat.")
-        
+        conversation = get_object_or_404(Conversation, id=conversation_id)
+
         content = request.POST.get('content')
-        if content:
-            Message.objects.create(
-                conversation=conversation,
-                sender=request.user,
-                content=content
-            )
-            conversation.last_message_at = timezone.now()
-            conversation.save()
-            for participant in conversation.participants.all():
-                if participant != request.user:
-                    Notification.objects.create(
-                        recipient=participant,
-                        message=f"New message from {request.user.username}",
-                        link=reverse('chat_view', args=[conversation_id])
-                    )
-            return JsonResponse({'status': 'success'})
+        if content and content.strip() and len(content) <= MAX_MESSAGE_LENGTH:
+            message, = persist_messages(conversation, request.user, [content])
+            return JsonResponse({'status': 'success', 'message': serialize_message(message)})
     return JsonResponse({'status': 'error'}, status=400)
 
 @login_required(login_url='/login/')
 def start_chat(request, user_id):
     other_user = get_object_or_404(User, id=user_id)
-    conversation = Conversation.objects.filter(
-        participants=request.user
-    ).filter(
-        participants=other_user
-    ).filter(
-        task__isnull=True
-    ).first()
-
-    if not conversation:
-        conversation = Conversation.objects.create()
-        conversation.participants.add(request.user, other_user)
+    conversation = get_or_create_direct(request.user, other_user)
 
     return redirect('chat_view', conversation_id=conversation.id)
+
+@login_required(login_url='/login/')
+def inbox_view(request):
+    try:
+        entries, next_cursor = inbox.inbox_page(request.user, cursor=request.GET.get('cursor'))
+    except InvalidCursor:
+        return redirect('inbox')
+    context = {'entries': entries, 'next_cursor': next_cursor}
+    return render(request, 'inbox.html', context)
+
+@login_required(login_url='/login/')
+def message_search(request):
+    query = request.GET.get('q', '').strip()
+    results, next_cursor = [], None
+    if query:
+        try:
+            results, next_cursor = search_page(request.user, query, cursor=request.GET.get('cursor'))
+        except InvalidCursor:
+            return redirect(f"{reverse('message_search')}?{urlencode({'q': query})}")
+    context = {'results': results, 'next_cursor': next_cursor, 'search_query': query}
+    return render(request, 'message_search.html', context)
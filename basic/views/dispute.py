@@ -2,6 +2,7 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from ..models import Dispute, Task, Notification
+from ..notifications import notify, mark_target_read
 from django.views.decorators.http import require_POST
 from django.urls import reverse
 
@@ -12,6 +13,7 @@ def dispute_detail_view(request, dispute_id):
     if request.user != task.posted_by and request.user != task.taken_by and not request.user.is_staff:
         messages.error(request, "You are not authorized to view this dispute.")
         return redirect('home')
+    mark_target_read(request.user.id, Notification.TARGET_DISPUTE, dispute.id)
     context = {
         'dispute': dispute,
         'task': task
@@ -34,10 +36,11 @@ def raise_dispute(request, task_id):
         dispute = Dispute.objects.create(task=task, raised_by=request.user, reason=reason)
         task.status = 'disputed'
         task.save()
-        Notification.objects.create(
+        notify(
             recipient=task.posted_by,
             message=f"{request.user.username} has raised a dispute for your task: '{task.title}'.",
-            link=reverse('dispute_detail', args=[dispute.id])
+            link=reverse('dispute_detail', args=[dispute.id]),
+            target=(Notification.TARGET_DISPUTE, dispute.id)
         )
         messages.success(request, "Dispute raised successfully.")
         return redirect('dispute_detail', dispute_id=dispute.id)
@@ -51,10 +54,11 @@ def withdraw_dispute(request, dispute_id):
     task.status = 'in_progress'
     task.save()
     dispute.delete()
-    Notification.objects.create(
+    notify(
         recipient=task.posted_by,
         message=f"{request.user.username} has withdrawn the dispute for '{task.title}'. The task is now in progress.",
-        link=reverse('my_tasks')
+        link=reverse('my_tasks'),
+        target=(Notification.TARGET_TASKS, None)
     )
     messages.success(request, f"You have successfully withdrawn the dispute for '{task.title}'.")
     return redirect('my_tasks')
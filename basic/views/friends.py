@@ -2,44 +2,114 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from ..models import UserProfile, FriendRequest, Friendship, Notification
+from ..notifications import notify, mark_target_read
 from django.contrib.auth.models import User
 from django.urls import reverse
-import json
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from ..directory import candidates, directory_page, display_name, serialize_entry
+from ..pagination import InvalidCursor, keyset_page
+from ..search import search_people
+
+PEOPLE_SEARCH_LIMIT = 20
+SUGGESTIONS_PAGE_SIZE = 10
+
+def _directory_filters(params):
+    """
+    Reads the directory filters from a query dict. Raises ValueError for a malformed batch.
+    """
+    batch = params.get('batch', '').strip()
+    return {
+        'college': params.get('college', '').strip(),
+        'major': params.get('major', '').strip(),
+        'batch': int(batch) if batch else None,
+        'prefix': params.get('q', '').strip(),
+    }
 
 @login_required(login_url='/login/')
 def user_list(request):
-    user_profile = get_object_or_404(UserProfile, user=request.user)
+    try:
+        filters = _directory_filters(request.GET)
+    except ValueError:
+        filters = _directory_filters({})
+    # Only the first page is rendered here, the rest comes from user_directory.
+    rows, next_cursor = directory_page(request.user, **filters)
+    return render(request, 'user_list.html', {
+        'filters': filters,
+        'entries': [serialize_entry(row) for row in rows],
+        'next_cursor': next_cursor,
+    })
 
-    # Get Firebase UIDs of users to exclude (friends, pending requests, self)
-    friend_uids = list(user_profile.friends.all().values_list('firebase_uid', flat=True))
-    sent_request_uids = list(FriendRequest.objects.filter(from_user=request.user).values_list('to_user__userprofile__firebase_uid', flat=True))
-    received_request_uids = list(FriendRequest.objects.filter(to_user=request.user).values_list('from_user__userprofile__firebase_uid', flat=True))
+@login_required(login_url='/login/')
+def user_directory(request):
+    """
+    Cursor-paginated directory of users the current user can add as friends, filterable by
+    college, major, batch and username prefix (?q=). Returns JSON by default, or a rendered
+    HTML fragment with ?format=html.
+    """
+    try:
+        filters = _directory_filters(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid batch.'}, status=400)
+    try:
+        rows, next_cursor = directory_page(request.user, cursor=request.GET.get('cursor'), **filters)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
 
-    # Combine all UIDs to exclude, including the current user's
-    exclude_uids = set(friend_uids) | set(sent_request_uids) | set(received_request_uids)
-    if user_profile.firebase_uid:
-        exclude_uids.add(user_profile.firebase_uid)
+    entries = [serialize_entry(row) for row in rows]
+    if request.GET.get('format') == 'html':
+        html = render_to_string('user_cards.html', {'entries': entries}, request=request)
+        return JsonResponse({'html': html, 'next_cursor': next_cursor})
+    return JsonResponse({'results': entries, 'next_cursor': next_cursor})
 
-    context = {
-        'exclude_uids_json': json.dumps(list(exclude_uids))
-    }
-    return render(request, 'user_list.html', context)
+@login_required(login_url='/login/')
+def people_search(request):
+    """
+    Typo-tolerant search over names, college, major, hostel and username, best matches first.
+    Only the top PEOPLE_SEARCH_LIMIT matches are returned. JSON with ?format=json.
+    """
+    query = request.GET.get('q', '').strip()
+    results = []
+    if query:
+        profiles = search_people(UserProfile.objects.all(), query).values(
+            'user_id', 'user__username', 'first_name', 'last_name', 'college', 'major', 'hostel'
+        )
+        results = [
+            {
+                'user_id': row['user_id'],
+                'username': row['user__username'],
+                'name': display_name(row),
+                'college': row['college'],
+                'major': row['major'],
+                'hostel': row['hostel'],
+            }
+            for row in profiles[:PEOPLE_SEARCH_LIMIT]
+        ]
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'results': results})
+    return render(request, 'people_search.html', {'results': results, 'search_query': query})
 
 @login_required(login_url='/login/')
 def friends_view(request):
     user_profile = get_object_or_404(UserProfile, user=request.user)
-    friendships = Friendship.objects.filter(from_user=user_profile).order_by('-closeness')
-    friend_requests = FriendRequest.objects.filter(to_user=request.user, is_accepted=False)
-    current_friends = user_profile.friends.all().values_list('user__id', flat=True)
-    sent_requests = FriendRequest.objects.filter(from_user=request.user).values_list('to_user_id', flat=True)
-    received_requests = FriendRequest.objects.filter(to_user=request.user).values_list('from_user_id', flat=True)
-    exclude_ids = set(current_friends) | set(sent_requests) | set(received_requests)
-    exclude_ids.add(request.user.id)
-    other_users = UserProfile.objects.exclude(user__id__in=exclude_ids)
+    mark_target_read(request.user.id, Notification.TARGET_FRIENDS)
+    friendships = Friendship.objects.filter(from_user=user_profile).select_related('to_user__user').order_by('-closeness')
+    friend_requests = FriendRequest.objects.filter(to_user=request.user, is_accepted=False).select_related('from_user')
+    # One page of suggestions; the exclusions are subqueries (see directory.candidates).
+    try:
+        other_users, suggestions_cursor = keyset_page(
+            candidates(request.user).select_related('user'),
+            cursor=request.GET.get('cursor'),
+            page_size=SUGGESTIONS_PAGE_SIZE,
+            ordering=('id',),
+        )
+    except InvalidCursor:
+        return redirect('friends')
     context = {
         'friendships': friendships,
         'friend_requests': friend_requests,
-        'other_users': other_users
+        'other_users': other_users,
+        'suggestions_cursor': suggestions_cursor,
     }
     return render(request, 'friends.html', context)
 
@@ -56,10 +126,11 @@ def send_friend_request(request, user_id):
         if created:
             messages.success(request, 'Friend request sent.')
             # Create notification for the recipient
-            Notification.objects.create(
+            notify(
                 recipient=to_user,
                 message=f"{request.user.username} sent you a friend request.",
-                link=reverse('friends') # Link to the friends page
+                link=reverse('friends'), # Link to the friends page
+                target=(Notification.TARGET_FRIENDS, None)
             )
         else:
             messages.info(request, 'Friend request already sent.')
@@ -86,10 +157,11 @@ def accept_friend_request(request, request_id):
         friend_request.delete()
         messages.success(request, 'Friend request accepted.')
         # Create notification for the sender
-        Notification.objects.create(
+        notify(
             recipient=from_user_profile.user,
             message=f"{request.user.username} accepted your friend request.",
-            link=reverse('friends') # Link to the friends page
+            link=reverse('friends'), # Link to the friends page
+            target=(Notification.TARGET_FRIENDS, None)
         )
     else:
         messages.error(request, 'Invalid request.')
@@ -102,7 +174,7 @@ def decline_friend_request(request, request_id):
         friend_request.delete()
         messages.success(request, 'Friend request declined.')
         # Optionally, notify the sender that their request was declined
-        # Notification.objects.create(
+        # notify(
         #     recipient=friend_request.from_user,
         #     message=f\"{request.user.username} declined your friend request.\",
         #     link=f\"{% url 'friends' %}\"
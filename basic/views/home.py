@@ -1,29 +1,96 @@
 from django.shortcuts import render
-from django.db.models import Q
-from ..models import UserProfile, Task, Friendship, Conversation
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from ..models import UserProfile, Task, InboxEntry
+from ..friend_graph import get_user_nodes
+from ..pagination import keyset_page, InvalidCursor
+from ..search import search_tasks
 import json
 
+FEED_PAGE_SIZE = 20
+FEED_SECTIONS = ('available', 'recent')
+
+
+def _feed_queryset(section):
+    """
+    Base queryset for one section of the home page task feed.
+    """
+    if section == 'available':
+        tasks = Task.objects.filter(status='available')
+    else:
+        # filter(status__in=ACTIVE_STATUSES) rather than exclude(), so the query matches the
+        # condition of the partial task_active_recent_idx and reads it in feed order.
+        tasks = Task.objects.filter(status__in=Task.ACTIVE_STATUSES)
+    return tasks.select_related('posted_by')
+
+
+def _feed_page(section, query='', cursor=None):
+    """
+    Returns (tasks, next_cursor) for one page of a feed section. Searches are ranked by
+    relevance instead of recency, so they return the best page of matches without a cursor.
+    """
+    tasks = _feed_queryset(section)
+    if query:
+        return list(search_tasks(tasks, query)[:FEED_PAGE_SIZE]), None
+    return keyset_page(tasks, cursor=cursor, page_size=FEED_PAGE_SIZE)
+
+
+def _serialize_task(task):
+    return {
+        'id': task.id,
+        'title': task.title,
+        'description': task.description,
+        'reward': task.reward,
+        'status': task.status,
+        'posted_by': task.posted_by.username,
+        'created_at': task.created_at.isoformat(),
+    }
+
+
+def task_feed(request):
+    """
+    Cursor-paginated task feed for the home page sections.
+    Returns JSON by default, or a rendered HTML fragment with ?format=html.
+    """
+    section = request.GET.get('section', 'available')
+    if section not in FEED_SECTIONS:
+        return JsonResponse({'error': 'Unknown section.'}, status=400)
+
+    try:
+        tasks, next_cursor = _feed_page(section, request.GET.get('q', ''), request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+
+    if request.GET.get('format') == 'html':
+        html = render_to_string('task_cards.html', {
+            'tasks': tasks,
+            'show_status': section == 'recent',
+        }, request=request)
+        return JsonResponse({'html': html, 'next_cursor': next_cursor})
+    return JsonResponse({
+        'results': [_serialize_task(task) for task in tasks],
+        'next_cursor': next_cursor,
+    })
+
+
 def home(request):
     # --- Disputed Tasks ---
     disputed_tasks = Task.objects.filter(status='disputed').order_by('-created_at')
 
-    # --- Search Logic for Available Tasks ---
+    # --- Search Logic for Available Tasks (first page only, the rest comes from task_feed) ---
     query = request.GET.get('q', '')
-    available_tasks = Task.objects.filter(status='available')
-    if query:
-        available_tasks = available_tasks.filter(
-            Q(title__icontains=query) | Q(description__icontains=query)
-        )
-    available_tasks = available_tasks.order_by('-created_at')[:20]
+    available_tasks, available_next_cursor = _feed_page('available', query)
 
     # --- All non-completed tasks for the new section ---
-    recent_tasks = Task.objects.exclude(status__in=['completed', 'cancelled']).order_by('-created_at')
-    
+    recent_tasks, recent_next_cursor = _feed_page('recent')
+
     # Initialize context for anonymous users
     context = {
         'disputed_tasks': disputed_tasks,
         'available_tasks': available_tasks,
+        'available_next_cursor': available_next_cursor,
         'recent_tasks': recent_tasks,
+        'recent_next_cursor': recent_next_cursor,
         'search_query': query,
         'user_nodes_json': json.dumps([]),
         'recent_conversations': []
@@ -33,36 +100,10 @@ def home(request):
         user_profile, created = UserProfile.objects.get_or_create(user=request.user)
 
         # --- Data for Recent Conversations ---
-        context['recent_conversations'] = Conversation.objects.filter(participants=request.user).order_by('-last_message_at')[:10]
+        context['recent_conversations'] = InboxEntry.objects.filter(user=request.user).order_by('-last_message_at', '-id')[:10]
 
         # --- Data for Friend Circle Visualization ---
-        user_nodes = []
-        friendships = Friendship.objects.filter(from_user=user_profile)
-        friend_ids = [friendship.to_user.user.id for friendship in friendships]
-        
-        for friendship in friendships:
-            user_nodes.append({
-                'id': friendship.to_user.user.id,
-                'username': friendship.to_user.user.username,
-                'closeness': friendship.closeness,
-                'phone': friendship.to_user.phone_number,
-                'is_phone_verified': friendship.to_user.is_phone_verified,
-                'instagram': friendship.to_user.instagram_username
-            })
-
-        max_nodes = 100
-        if len(user_nodes) < max_nodes:
-            exclude_ids = friend_ids + [request.user.id]
-            other_users = UserProfile.objects.exclude(user__id__in=exclude_ids)[:max_nodes - len(user_nodes)]
-            for other_user in other_users:
-                user_nodes.append({
-                    'id': other_user.user.id,
-                    'username': other_user.user.username,
-                    'closeness': 0,
-                    'phone': other_user.phone_number,
-                    'is_phone_verified': other_user.is_phone_verified,
-                    'instagram': other_user.instagram_username
-                })
+        user_nodes = get_user_nodes(user_profile)
         context['user_nodes_json'] = json.dumps(user_nodes)
 
     return render(request, 'home.html', context)
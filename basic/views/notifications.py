@@ -1,10 +1,27 @@
-from django.shortcuts import render
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from ..models import Notification
+from ..notifications import decrement_unread
+from ..pagination import keyset_page, InvalidCursor
+
+NOTIFICATIONS_PAGE_SIZE = 30
 
 @login_required(login_url='/login/')
 def notifications_view(request):
-    notifications = Notification.objects.filter(recipient=request.user).order_by('-created_at')
-    # Mark all unread notifications as read when the page is viewed
-    Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
-    return render(request, 'notifications.html', {'notifications': notifications})
+    try:
+        notifications, next_cursor = keyset_page(
+            Notification.objects.filter(recipient=request.user),
+            cursor=request.GET.get('cursor'),
+            page_size=NOTIFICATIONS_PAGE_SIZE,
+        )
+    except InvalidCursor:
+        return redirect('notifications')
+
+    # Mark only the notifications on this page as read; they still render as unread this time.
+    unread_ids = [notification.id for notification in notifications if not notification.is_read]
+    if unread_ids:
+        marked = Notification.objects.filter(id__in=unread_ids, is_read=False).update(is_read=True)
+        decrement_unread(request.user.id, marked)
+
+    context = {'notifications': notifications, 'next_cursor': next_cursor}
+    return render(request, 'notifications.html', context)
@@ -5,8 +5,9 @@ from ..models import UserProfile, Task, Friendship
 from django.contrib.auth.models import User
 import json
 from django.http import JsonResponse, HttpResponse
-from firebase_admin import auth
-from django.apps import apps # Import apps to access app config
+from .. import firebase_auth
+from django.db import transaction
+from ..firestore_sync import USER_PROFILE_FIELDS, sync_user_profile
 
 # Health check endpoint
 def ping(request):
@@ -15,9 +16,15 @@ def ping(request):
 
 @login_required(login_url='/login/')
 def profile_view(request):
-    db = apps.get_app_config('basic').firestore_db # Get Firestore client
     profile, created = UserProfile.objects.get_or_create(user=request.user)
     if request.method == 'POST':
+        # Coerced here so the Firestore payload built from the instance holds a number too.
+        try:
+            batch = int(request.POST.get('batch') or profile.batch)
+        except ValueError:
+            messages.error(request, 'Batch must be a year, e.g. 2027.')
+            return redirect('profile')
+
         # Update Django model
         profile.first_name = request.POST.get('first_name', '')
         profile.last_name = request.POST.get('last_name', '')
@@ -25,7 +32,7 @@ def profile_view(request):
         profile.college = request.POST.get('college', '')
         profile.major = request.POST.get('major', '')
         profile.roll_no = request.POST.get('roll_no', '')
-        profile.batch = request.POST.get('batch', 2029)
+        profile.batch = batch
         
         # Check if phone number has changed
         new_phone_number = request.POST.get('phone_number', '')
@@ -34,28 +41,10 @@ def profile_view(request):
             profile.is_phone_verified = False # Reset verification status
 
         profile.instagram_username = request.POST.get('instagram_username', '')
-        profile.save()
-
-        # Update Firestore document
-        if db and request.user.userprofile.firebase_uid:
-            try:
-                user_ref = db.collection('users').document(request.user.userprofile.firebase_uid)
-                user_ref.set({
-                    'username': request.user.username,
-                    'first_name': profile.first_name,
-                    'last_name': profile.last_name,
-                    'bio': profile.bio,
-                    'college': profile.college,
-                    'major': profile.major,
-                    'roll_no': profile.roll_no,
-                    'batch': profile.batch,
-                    'phone_number': profile.phone_number,
-                    'is_phone_verified': profile.is_phone_verified,
-                    'instagram_username': profile.instagram_username,
-                }, merge=True) # merge=True prevents overwriting the whole document
-                messages.success(request, 'Profile updated in Firebase.')
-            except Exception as e:
-                messages.error(request, f'Error updating Firebase profile: {e}')
+        # The Firestore copy is updated by the drain_firestore_sync worker, not in the request.
+        with transaction.atomic():
+            profile.save(update_fields=USER_PROFILE_FIELDS)
+            sync_user_profile(profile)
 
         messages.success(request, 'Profile updated successfully.')
         return redirect('profile')
@@ -122,7 +111,6 @@ def update_closeness(request, friendship_id):
 
 @login_required(login_url='/login/')
 def verify_phone_token(request):
-    db = apps.get_app_config('basic').firestore_db # Get Firestore client
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
@@ -131,7 +119,7 @@ def verify_phone_token(request):
             if not id_token:
                 return JsonResponse({'success': False, 'error': 'No token provided.'}, status=400)
 
-            decoded_token = auth.verify_id_token(id_token)
+            decoded_token = firebase_auth.verify_id_token(id_token)
             firebase_phone_number = decoded_token.get('phone_number')
 
             if not firebase_phone_number:
@@ -142,18 +130,9 @@ def verify_phone_token(request):
             # Trust the number from the Firebase token, since the user just verified it.
             user_profile.is_phone_verified = True
             user_profile.phone_number = firebase_phone_number
-            user_profile.save()
-
-            # Also update the phone number in Firestore
-            if db and user_profile.firebase_uid:
-                try:
-                    user_ref = db.collection('users').document(user_profile.firebase_uid)
-                    user_ref.set({
-                        'phone_number': firebase_phone_number,
-                        'is_phone_verified': True
-                    }, merge=True)
-                except Exception as e:
-                    print(f"Error updating phone number in Firebase: {e}") # Log error
+            with transaction.atomic():
+                user_profile.save(update_fields=['phone_number', 'is_phone_verified'])
+                sync_user_profile(user_profile, fields=('phone_number', 'is_phone_verified'))
 
             return JsonResponse({'success': True})
 
@@ -1,7 +1,9 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from ..models import Task, Conversation, Notification, RewardLedger
+from ..models import Task, Conversation, RewardLedger, Notification
+from ..notifications import notify
+from .. import inbox
 from django.db import transaction
 from django.urls import reverse
 from django.utils import timezone
@@ -38,7 +40,7 @@ def add_task(request):
 
             with transaction.atomic():
                 user_profile.rewards -= reward
-                user_profile.save()
+                user_profile.save(update_fields=['rewards'])
                 new_task = Task.objects.create(
                     title=title, description=description, reward=reward,
                     posted_by=request.user, deadline=deadline, status='available'
@@ -71,10 +73,12 @@ def take_task(request, task_id):
             conversation, created = Conversation.objects.get_or_create(task=task)
             if created:
                 conversation.participants.add(task.posted_by, task.taken_by)
-            Notification.objects.create(
+                inbox.sync_conversation(conversation, [task.posted_by, task.taken_by])
+            notify(
                 recipient=task.posted_by,
                 message=f"{request.user.username} has taken your task: {task.title}",
-                link=reverse('my_tasks')
+                link=reverse('my_tasks'),
+                target=(Notification.TARGET_TASKS, None)
             )
             messages.success(request, "Task has been assigned to you. A chat has been created.")
     return redirect('my_tasks')
@@ -85,7 +89,7 @@ def complete_task(request, task_id):
     with transaction.atomic():
         task_doer_profile = task.taken_by.userprofile
         task_doer_profile.rewards += task.reward
-        task_doer_profile.save()
+        task_doer_profile.save(update_fields=['rewards'])
         task.status = 'completed'
         task.save()
 
@@ -108,7 +112,7 @@ def cancel_task(request, task_id):
         task.save()
         user_profile = request.user.userprofile
         user_profile.rewards += task.reward
-        user_profile.save()
+        user_profile.save(update_fields=['rewards'])
         RewardLedger.objects.create(
             user=request.user, task=task, amount=task.reward,
             transaction_type='task_cancellation', description=f"Refund for cancelled task: "
@@ -121,10 +125,11 @@ def request_cancellation(request, task_id):
     task = get_object_or_404(Task, id=task_id, posted_by=request.user, status='in_progress')
     task.cancellation_requested = True
     task.save()
-    Notification.objects.create(
+    notify(
         recipient=task.taken_by,
         message=f"{request.user.username} has requested to cancel the task: '{task.title}'.",
-        link=reverse('my_tasks')
+        link=reverse('my_tasks'),
+        target=(Notification.TARGET_TASKS, None)
     )
     messages.success(request, "A cancellation request has been sent to the task taker.")
     return redirect('my_tasks')
@@ -135,7 +140,7 @@ def accept_cancellation(request, task_id):
     with transaction.atomic():
         poster_profile = task.posted_by.userprofile
         poster_profile.rewards += task.reward
-        poster_profile.save()
+        poster_profile.save(update_fields=['rewards'])
         RewardLedger.objects.create(
             user=task.posted_by, task=task, amount=task.reward,
             transaction_type='task_cancellation', description=f"Refund for cancelled task: '{task.title}'"
@@ -144,10 +149,11 @@ def accept_cancellation(request, task_id):
         task.taken_by = None
         task.cancellation_requested = False
         task.save()
-        Notification.objects.create(
+        notify(
             recipient=task.posted_by,
             message=f"{request.user.username} accepted your cancellation request for '{task.title}'. The task is now available again.",
-            link=reverse('my_tasks')
+            link=reverse('my_tasks'),
+            target=(Notification.TARGET_TASKS, None)
         )
         messages.success(request, "You have accepted the cancellation. The task is now available for others.")
     return redirect('my_tasks')
@@ -159,10 +165,11 @@ def abandon_task(request, task_id):
         task.status = 'available'
         task.taken_by = None
         task.save()
-        Notification.objects.create(
+        notify(
             recipient=task.posted_by,
             message=f"{request.user.username} has abandoned your task: '{task.title}'. It is now available again.",
-            link=reverse('my_tasks')
+            link=reverse('my_tasks'),
+            target=(Notification.TARGET_TASKS, None)
         )
         messages.success(request, "You have abandoned the task. It is now available for others.")
     return redirect('my_tasks')